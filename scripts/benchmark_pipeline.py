@@ -0,0 +1,365 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from update_semesters import (
+    COURSE_ID_RE,
+    apply_course_overrides,
+    build_course_map,
+    clear_prereq_parse_cache,
+    compute_file_sha256,
+    finalize_course_map,
+    get_build_cache_filename,
+    get_semester_data_filename,
+    get_semester_label,
+    iter_saved_courses,
+    load_cached_semester,
+    merge_course_maps,
+    parse_prerequisite_tree,
+    save_cached_semester,
+)
+from publish import serialize_json
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA_DIR = SCRIPTS_DIR.parent / "public" / "data"
+DEFAULT_BASELINE_FILE = SCRIPTS_DIR / "benchmark_baseline.json"
+
+# Synthetic workloads as (course copies, semester generations). 10x10 gives
+# 100 times the course records of the bundled semesters.
+DEFAULT_SCALES = ["10x1", "1x10", "10x10"]
+
+# Fields of a raw course's 'general' section that hold course ids and are
+# rewritten for each synthetic copy
+COURSE_ID_FIELDS = ('מספר מקצוע', 'מקצועות קדם', 'מקצועות ללא זיכוי נוסף', 'מקצועות ללא זיכוי נוסף (מוכלים)')
+
+# Synthetic ids are 9XXXXYYY: XXXX is the ordinal of the original id, YYY the
+# copy number. No real Technion course id starts with 90-96.
+SYNTHETIC_ID_BASE = 90_000_000
+MAX_COURSE_COPIES = 1000
+
+# Iterations of the fixed calibration workload timed right before every case.
+# Throughput is compared with the baseline relative to it, so a slower or busier
+# machine does not show up as a regression.
+CALIBRATION_ITERATIONS = 50_000
+# Short cases are repeated until their timed runs add up to this many seconds,
+# so that the best run is not just scheduler noise
+MIN_MEASURE_SECONDS = 0.5
+MAX_MEASURE_RUNS = 1000
+
+def load_bundled_semesters(data_dir):
+    """Returns [(semester_key, filename)] for the bundled semesters, newest first, as update_semesters merges them."""
+    with open(Path(data_dir) / "last_semesters.json", "r", encoding="utf-8") as f:
+        semester_keys = sorted(json.load(f), reverse=True)
+    return [(key, get_semester_data_filename(data_dir, key)) for key in semester_keys]
+
+def serialize_merged_courses(merged_map):
+    """Serializes the merged map exactly as update_semesters writes merged_courses.json."""
+    return serialize_json(merged_map)
+
+def run_merge(semesters):
+    """
+    Builds and merges course maps over semesters, given as [(semester_key, courses)]
+    newest first, the way update_semesters does. Returns (merged_map, course_records).
+    """
+    merged_map = {}
+    course_records = 0
+    for semester_key, courses in semesters:
+        semester_map = build_course_map(courses, get_semester_label(semester_key[4:]))
+        course_records += len(semester_map)
+        merged_map = merge_course_maps(merged_map, semester_map)
+    finalize_course_map(merged_map)
+    with contextlib.redirect_stdout(io.StringIO()):
+        apply_course_overrides(merged_map)
+    return merged_map, course_records
+
+def make_synthetic_courses(courses, copy_index, id_ordinals):
+    """Returns copy number copy_index of courses, with every course id mapped to a synthetic one."""
+    if copy_index == 0:
+        return courses
+
+    def synthetic_id(match):
+        ordinal = id_ordinals.setdefault(match.group(0), len(id_ordinals))
+        return str(SYNTHETIC_ID_BASE + ordinal * MAX_COURSE_COPIES + copy_index)
+
+    synthetic_courses = []
+    for course in courses:
+        general = dict(course.get('general', {}))
+        for field in COURSE_ID_FIELDS:
+            if isinstance(general.get(field), str):
+                general[field] = COURSE_ID_RE.sub(synthetic_id, general[field])
+        synthetic_courses.append({**course, 'general': general})
+    return synthetic_courses
+
+def build_synthetic_semesters(bundled_courses, course_copies, semester_generations):
+    """
+    Scales the bundled semesters to course_copies times the courses (each copy
+    with its own ids) and semester_generations times the semesters (each
+    generation moved two years further back). Returns [(semester_key, courses)]
+    newest first. The per-copy course lists are shared between generations.
+    """
+    id_ordinals = {}
+    copies_by_semester = {
+        semester_key: [course for copy_index in range(course_copies)
+                       for course in make_synthetic_courses(courses, copy_index, id_ordinals)]
+        for semester_key, courses in bundled_courses
+    }
+    semesters = []
+    for generation in range(semester_generations):
+        for semester_key, _ in bundled_courses:
+            synthetic_key = f"{int(semester_key[:4]) - 2 * generation}{semester_key[4:]}"
+            semesters.append((synthetic_key, copies_by_semester[semester_key]))
+    return semesters
+
+def parse_scale(value):
+    course_copies, _, semester_generations = value.lower().partition("x")
+    try:
+        course_copies, semester_generations = int(course_copies), int(semester_generations)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected COURSESxSEMESTERS such as 10x1, got '{value}'")
+    if not 1 <= course_copies < MAX_COURSE_COPIES or semester_generations < 1:
+        raise argparse.ArgumentTypeError(f"Scale factors out of range in '{value}'")
+    return value.lower(), course_copies, semester_generations
+
+def run_calibration(repeat):
+    """
+    Times a fixed pure-Python workload of the kind the pipeline does (string
+    formatting, regex matching, dict and list updates) and returns its best
+    iterations per second. It does not depend on any code under test.
+    """
+    best_seconds = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.process_time()
+        table = {}
+        for i in range(CALIBRATION_ITERATIONS):
+            key = f"{i % 4096:08d}"
+            table.setdefault(key, []).append(COURSE_ID_RE.fullmatch(key) is not None)
+        elapsed = time.process_time() - start
+        best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+    return CALIBRATION_ITERATIONS / best_seconds
+
+def measure(run, setup, repeat):
+    """
+    Times run(setup()) at least repeat times, and until the timed runs add up to
+    MIN_MEASURE_SECONDS (setup is not timed), then measures its peak traced
+    allocation in one further run, since tracemalloc slows execution. The
+    calibration workload is timed just before, so the result can be compared
+    with a baseline from another machine or a busier moment. Timings are process
+    CPU time, so time spent descheduled on a shared machine does not count.
+    run returns the number of items it processed. Returns a result dict.
+    """
+    calibration = run_calibration(repeat)
+    best_seconds = None
+    total_seconds = 0.0
+    runs = 0
+    while runs < repeat or (total_seconds < MIN_MEASURE_SECONDS and runs < MAX_MEASURE_RUNS):
+        state = setup()
+        gc.collect()
+        start = time.process_time()
+        items = run(state)
+        elapsed = time.process_time() - start
+        best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+        total_seconds += elapsed
+        runs += 1
+        del state
+
+    state = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "items": items,
+        "seconds": best_seconds,
+        "items_per_second": items / best_seconds if best_seconds else 0.0,
+        "calibration": calibration,
+        "peak_mb": peak_bytes / (1024 * 1024),
+    }
+
+def run_benchmarks(data_dir, scales, repeat):
+    """Runs every benchmark case. Returns (results, output_matches)."""
+    bundled_semesters = load_bundled_semesters(data_dir)
+    bundled_courses = [(key, list(iter_saved_courses(filename))) for key, filename in bundled_semesters]
+    prereq_strings = sorted({
+        course.get('general', {}).get('מקצועות קדם')
+        for _, courses in bundled_courses for course in courses
+    } - {None, ""})
+    results = {}
+
+    def parse_all(strings):
+        for prereq_str in strings:
+            parse_prerequisite_tree(prereq_str)
+        return len(strings)
+
+    def cold_cache(value):
+        clear_prereq_parse_cache()
+        return value
+
+    def warm_cache(strings):
+        parse_all(strings)
+        return strings
+
+    results["parse_prerequisite_tree[cold]"] = measure(parse_all, lambda: cold_cache(prereq_strings), repeat)
+    results["parse_prerequisite_tree[warm]"] = measure(parse_all, lambda: warm_cache(prereq_strings), repeat)
+
+    def build_all(semesters):
+        return sum(len(build_course_map(courses, get_semester_label(key[4:]))) for key, courses in semesters)
+
+    results["build_course_map[bundled]"] = measure(build_all, lambda: cold_cache(bundled_courses), repeat)
+
+    def merge_all(semester_maps):
+        merged_map = {}
+        for semester_map in semester_maps:
+            merged_map = merge_course_maps(merged_map, semester_map)
+        return sum(len(semester_map) for semester_map in semester_maps)
+
+    def build_semester_maps(semesters):
+        return [build_course_map(courses, get_semester_label(key[4:])) for key, courses in semesters]
+
+    results["merge_course_maps[bundled]"] = measure(merge_all, lambda: build_semester_maps(bundled_courses), repeat)
+
+    # End to end over the files on disk, including incremental JSON decoding
+    def pipeline_from_files(semesters):
+        return run_merge((key, iter_saved_courses(filename)) for key, filename in semesters)[1]
+
+    results["pipeline[bundled]"] = measure(pipeline_from_files, lambda: cold_cache(bundled_semesters), repeat)
+
+    # The same rebuild with every semester already in the build cache, as after an override change
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_filenames = []
+        for key, filename in bundled_semesters:
+            semester_label = get_semester_label(key[4:])
+            cache_filename = get_build_cache_filename(cache_dir, key, compute_file_sha256(filename), semester_label)
+            save_cached_semester(cache_filename, build_course_map(iter_saved_courses(filename), semester_label), {})
+            cache_filenames.append((key, filename, cache_filename))
+
+        def pipeline_from_cache(semesters):
+            merged_map = {}
+            course_records = 0
+            for key, filename, cache_filename in semesters:
+                compute_file_sha256(filename)
+                semester_map, _ = load_cached_semester(cache_filename)
+                course_records += len(semester_map)
+                merged_map = merge_course_maps(merged_map, semester_map)
+            finalize_course_map(merged_map)
+            with contextlib.redirect_stdout(io.StringIO()):
+                apply_course_overrides(merged_map)
+            return course_records
+
+        results["pipeline[bundled, cached]"] = measure(pipeline_from_cache, lambda: cache_filenames, repeat)
+
+    clear_prereq_parse_cache()
+    merged_map, _ = run_merge((key, iter_saved_courses(filename)) for key, filename in bundled_semesters)
+    output_matches = serialize_merged_courses(merged_map) == (Path(data_dir) / "merged_courses.json").read_bytes()
+
+    for scale_name, course_copies, semester_generations in scales:
+        print(f"Building synthetic {scale_name} workload...")
+        synthetic_semesters = build_synthetic_semesters(bundled_courses, course_copies, semester_generations)
+        results[f"pipeline[synthetic {scale_name}]"] = measure(
+            lambda semesters: run_merge(semesters)[1], lambda: cold_cache(synthetic_semesters), repeat)
+        del synthetic_semesters
+
+    return results, output_matches
+
+def compare_with_baseline(report, baseline_report, tolerance):
+    """
+    Prints each result next to its baseline. A throughput ratio is divided by the
+    ratio of the calibration runs timed before the case, when both have one.
+    Returns (speed_regressions, memory_regressions): the names of cases that got
+    slower or used more memory than tolerance allows.
+    """
+    baseline = baseline_report.get("results", {})
+    speed_regressions = []
+    memory_regressions = []
+    print(f"{'case':<36} {'items/s':>12} {'vs base':>8} {'peak MB':>9} {'vs base':>8}")
+    for name, result in report["results"].items():
+        base = baseline.get(name)
+        speed_ratio = memory_ratio = None
+        if base:
+            if base["items_per_second"]:
+                calibration_ratio = result["calibration"] / base["calibration"] if base.get("calibration") else 1.0
+                speed_ratio = result["items_per_second"] / base["items_per_second"] / calibration_ratio
+            memory_ratio = result["peak_mb"] / base["peak_mb"] if base["peak_mb"] else None
+            if speed_ratio is not None and speed_ratio < 1 - tolerance:
+                speed_regressions.append(name)
+            if memory_ratio is not None and memory_ratio > 1 + tolerance:
+                memory_regressions.append(name)
+        print(f"{name:<36} {result['items_per_second']:>12,.0f} "
+              f"{f'{speed_ratio:.2f}x' if speed_ratio else '-':>8} {result['peak_mb']:>9.2f} "
+              f"{f'{memory_ratio:.2f}x' if memory_ratio else '-':>8}")
+    return speed_regressions, memory_regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of the course data pipeline (build_course_map, merge_course_maps, "
+                    "parse_prerequisite_tree and the build cache) on the bundled semester files and synthetically scaled inputs."
+    )
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="Directory holding last_semesters.json, the semester files and merged_courses.json (default: public/data).")
+    parser.add_argument("--scale", type=parse_scale, action="append", dest="scales",
+                        help="Synthetic workload COURSESxSEMESTERS, e.g. 100x1; may be repeated "
+                             f"(default: {' '.join(DEFAULT_SCALES)}).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help=f"Minimum timed runs per case; short cases run until they add up to {MIN_MEASURE_SECONDS:g}s. "
+                             "The fastest run is reported (default: 3).")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_FILE,
+                        help="Results to compare against. Throughput is normalized by a calibration run, but a drop only "
+                             "fails the run if the baseline was recorded on this host; record your own with --update-baseline.")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Write this run's results to the baseline file instead of comparing against it.")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed relative drop in throughput or growth in peak memory before a case counts as a regression (default: 0.3).")
+    parser.add_argument("--output", type=Path,
+                        help="Also write this run's results as JSON to this path.")
+    args = parser.parse_args(argv)
+    scales = args.scales or [parse_scale(scale) for scale in DEFAULT_SCALES]
+
+    results, output_matches = run_benchmarks(args.data_dir, scales, max(args.repeat, 1))
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "host": platform.node(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_report = json.load(f)
+    except FileNotFoundError:
+        baseline_report = {}
+    speed_regressions, memory_regressions = compare_with_baseline(
+        report, {} if args.update_baseline else baseline_report, args.tolerance)
+    # Peak memory does not depend on the machine, throughput does even after calibration
+    local_baseline = baseline_report.get("host") == report["host"]
+    regressions = memory_regressions + (speed_regressions if local_baseline else [])
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Wrote baseline to {args.baseline}.")
+    for name in regressions:
+        print(f"Regression: {name} is more than {args.tolerance:.0%} worse than the baseline.")
+    if speed_regressions and not local_baseline:
+        print(f"Slower than the baseline: {', '.join(speed_regressions)}. The baseline was recorded on another "
+              "host, so this is not treated as a failure; record a local one with --update-baseline to enforce it.")
+
+    if output_matches:
+        print("Merged output of the bundled semesters matches merged_courses.json.")
+    else:
+        print("Merged output of the bundled semesters differs from merged_courses.json.")
+    return 1 if regressions or not output_matches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
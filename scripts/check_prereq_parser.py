@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from update_semesters import SEMESTER_DATA_FILE_GLOB, parse_prerequisite_tree, prereq_parse_cache_info
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_DATA_DIR = SCRIPTS_DIR.parent / "public" / "data"
+DEFAULT_GOLDEN_FILE = SCRIPTS_DIR / "prereq_trees.golden.json"
+
+def collect_prereq_strings(data_dir):
+    """Returns every distinct 'מקצועות קדם' string found in the semester files of data_dir."""
+    prereq_strings = set()
+    for courses_file in sorted(Path(data_dir).glob(SEMESTER_DATA_FILE_GLOB)):
+        with open(courses_file, "r", encoding="utf-8") as f:
+            for course in json.load(f):
+                prereq_str = course.get("general", {}).get("מקצועות קדם")
+                if prereq_str:
+                    prereq_strings.add(prereq_str)
+    return prereq_strings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Golden check: parse every prerequisite string in the bundled semester files and "
+                    "compare the trees with the recorded snapshot."
+    )
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help="Directory holding the courses_YYYY_SSS.json semester files (default: public/data).")
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN_FILE,
+                        help="Snapshot of expected trees keyed by the raw prerequisite string.")
+    parser.add_argument("--update", action="store_true",
+                        help="Add trees for prerequisite strings missing from the snapshot instead of failing on them.")
+    args = parser.parse_args(argv)
+
+    prereq_strings = collect_prereq_strings(args.data_dir)
+    try:
+        with open(args.golden, "r", encoding="utf-8") as f:
+            golden = json.load(f)
+    except FileNotFoundError:
+        golden = {}
+
+    mismatches = []
+    missing = []
+    for prereq_str in sorted(prereq_strings | set(golden)):
+        tree = parse_prerequisite_tree(prereq_str)
+        if prereq_str not in golden:
+            missing.append(prereq_str)
+            if args.update:
+                golden[prereq_str] = tree
+        elif tree != golden[prereq_str]:
+            mismatches.append(prereq_str)
+
+    for prereq_str in mismatches:
+        print(f"Mismatch for '{prereq_str}':")
+        print(f"  expected: {json.dumps(golden[prereq_str], ensure_ascii=False)}")
+        print(f"  got:      {json.dumps(parse_prerequisite_tree(prereq_str), ensure_ascii=False)}")
+
+    if args.update and missing:
+        with open(args.golden, "w", encoding="utf-8") as f:
+            json.dump(golden, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"Added {len(missing)} prerequisite strings to {args.golden}.")
+    elif missing:
+        print(f"{len(missing)} prerequisite strings have no golden tree; rerun with --update to record them.")
+
+    cache_info = prereq_parse_cache_info()
+    print(f"Checked {len(prereq_strings | set(golden))} prerequisite strings: {len(mismatches)} mismatches "
+          f"(parse cache: {cache_info.hits} hits, {cache_info.misses} misses).")
+    return 1 if mismatches or (missing and not args.update) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from publish import (compress_staged_files, create_staging_dir, discard_staging_dir, publish_staged_files,
+                     write_minified_json)
+
+# Directory holding degrees.json and merged_courses.json; compiled plans are written next to them
+DEFAULT_PUBLIC_DATA_DIR = Path("public/data")
+DEGREES_FILENAME = "degrees.json"
+MERGED_COURSES_FILENAME = "merged_courses.json"
+# One compiled plan per degree: compiled_degrees/<degree id>.json
+COMPILED_DEGREES_DIRNAME = "compiled_degrees"
+
+# Top-level entries of degrees.json that are not degree templates
+NON_DEGREE_KEYS = ("globalRules",)
+# id_pattern values are leading digits of a course id
+ID_PATTERN_RE = re.compile(r'\d{1,8}')
+
+# Rule types that are not sums over the planned courses; they stay with evaluateRule
+UNCOMPILED_RULE_TYPES = ("min_grade", "classification_courses")
+
+def parse_credits(value):
+    """Credits of a course as a number, 0 when missing or malformed (as Number(credits) || 0 in ruleEvaluator.ts)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def compile_degree(degree_id, template, merged_map):
+    """
+    Compiles the rules of one degree template into counting targets, mirroring
+    src/utils/ruleEvaluator.ts. Every target is one progress counter of a rule (or
+    of one list of a multi-list rule) with its unit, "credits" or "courses", and
+    required value. Course sets are resolved here: lists are looked up, id
+    patterns are matched against merged_map and mandatory courses are collected
+    from the semesters. The result maps each known course to its credits and the
+    targets it counts towards, so evaluating a plan is a sum over its courses.
+    A course is listed once per target per list it appears in, matching how
+    evaluateRule counts minCreditsFromSelectedLists. Targets with "all_courses"
+    count every planned course and have no members.
+
+    Returns (compiled, errors, unknown_course_ids). errors are messages about rules
+    that could not be compiled; unknown_course_ids maps each id that is not in
+    merged_map to where it was referenced. Unknown courses are left out, since
+    they cannot be added to a plan.
+    """
+    course_lists = template.get("courses-lists") or {}
+    targets = []
+    memberships = {}
+    uncompiled_rule_ids = []
+    errors = []
+    unknown_course_ids = {}
+
+    def check_course_ids(course_ids, where):
+        known_ids = []
+        for course_id in course_ids:
+            if course_id in merged_map:
+                known_ids.append(course_id)
+            else:
+                unknown_course_ids.setdefault(course_id, []).append(where)
+        return known_ids
+
+    def get_list(list_name, rule_id):
+        if not isinstance(course_lists.get(list_name), list):
+            errors.append(f"rule '{rule_id}' refers to missing course list '{list_name}'")
+            return None
+        return course_lists[list_name]
+
+    def add_target(rule, unit, required, course_id_groups=(), list_name=None, all_courses=False, exemptions=False):
+        target_index = len(targets)
+        targets.append({
+            "rule": rule.get("id"),
+            "type": rule.get("type"),
+            "list": list_name,
+            "unit": unit,
+            "required": required,
+            "all_courses": all_courses,
+            "exemptions": exemptions,
+        })
+        for course_ids in course_id_groups:
+            for course_id in dict.fromkeys(course_ids):
+                memberships.setdefault(course_id, []).append(target_index)
+
+    for list_name, course_ids in course_lists.items():
+        check_course_ids(course_ids, f"list '{list_name}'")
+    mandatory_course_ids = []
+    for semester_name, course_ids in (template.get("semesters") or {}).items():
+        mandatory_course_ids.extend(check_course_ids(course_ids, f"semester '{semester_name}'"))
+
+    for rule in template.get("rules") or []:
+        rule_id = rule.get("id")
+        rule_type = rule.get("type")
+        required_key = "required_credits" if rule_type in ("total_credits", "credits_from_list") else "min"
+        required = rule.get(required_key)
+        if rule_type in UNCOMPILED_RULE_TYPES:
+            uncompiled_rule_ids.append(rule_id)
+            continue
+        if rule_type in ("total_credits", "minCredits", "credits_from_list", "minCreditsFromMandatory",
+                         "minCreditsFromAnySelectiveList", "minCreditsFromIdPattern", "minCoursesFromList") \
+                and required is None:
+            errors.append(f"rule '{rule_id}' ({rule_type}) has no '{required_key}'")
+            continue
+
+        if rule_type in ("total_credits", "minCredits"):
+            add_target(rule, "credits", required, all_courses=True, exemptions=rule_type == "total_credits")
+        elif rule_type == "credits_from_list":
+            list_course_ids = get_list(rule.get("course_list_name"), rule_id)
+            if list_course_ids is not None:
+                add_target(rule, "credits", required, [list_course_ids], list_name=rule.get("course_list_name"))
+        elif rule_type == "minCreditsFromMandatory":
+            add_target(rule, "credits", required, [mandatory_course_ids])
+        elif rule_type == "minCreditsFromAnySelectiveList":
+            selective_course_ids = [course_id for course_ids in course_lists.values() for course_id in course_ids]
+            add_target(rule, "credits", required, [selective_course_ids], exemptions=True)
+        elif rule_type == "minCreditsFromIdPattern":
+            pattern = rule.get("id_pattern")
+            if not isinstance(pattern, str) or not ID_PATTERN_RE.fullmatch(pattern):
+                errors.append(f"rule '{rule_id}' has an invalid id_pattern {pattern!r}")
+                continue
+            excluded_ids = set(rule.get("exclude_courses") or [])
+            check_course_ids(sorted(excluded_ids), f"rule '{rule_id}' exclude_courses")
+            pattern_course_ids = sorted(course_id for course_id in merged_map
+                                        if course_id.startswith(pattern) and course_id not in excluded_ids)
+            if not pattern_course_ids:
+                errors.append(f"rule '{rule_id}' id_pattern '{pattern}' matches no course")
+            add_target(rule, "credits", required, [pattern_course_ids])
+        elif rule_type == "minCoursesFromList":
+            list_course_ids = get_list(rule.get("listName"), rule_id)
+            if list_course_ids is not None:
+                add_target(rule, "courses", required, [list_course_ids], list_name=rule.get("listName"))
+        elif rule_type == "minCoursesFromMultipleLists":
+            for list_rule in rule.get("lists") or []:
+                list_name = list_rule.get("listName")
+                list_course_ids = get_list(list_name, rule_id)
+                if list_rule.get("minCredits") is not None:
+                    unit, list_required = "credits", list_rule["minCredits"]
+                elif list_rule.get("min") is not None:
+                    unit, list_required = "courses", list_rule["min"]
+                else:
+                    errors.append(f"rule '{rule_id}' list '{list_name}' has neither 'min' nor 'minCredits'")
+                    continue
+                add_target(rule, unit, list_required, [list_course_ids or []], list_name=list_name)
+        elif rule_type == "minCreditsFromSelectedLists":
+            for combined_rule in rule.get("combinedRules") or []:
+                selected_lists = [get_list(list_name, rule_id) for list_name in combined_rule.get("selectedLists") or []]
+                unit = "courses" if combined_rule.get("requirementType") == "courses" else "credits"
+                add_target(rule, unit, combined_rule.get("min"),
+                           [course_ids for course_ids in selected_lists if course_ids is not None],
+                           list_name=combined_rule.get("description"))
+        else:
+            errors.append(f"rule '{rule_id}' has unknown type '{rule_type}'")
+
+    compiled = {
+        "degree": degree_id,
+        "name": template.get("name"),
+        "targets": targets,
+        "courses": {
+            course_id: {"credits": parse_credits(merged_map[course_id].get("credits")), "targets": target_indexes}
+            for course_id, target_indexes in sorted(memberships.items()) if course_id in merged_map
+        },
+        "uncompiled_rules": uncompiled_rule_ids,
+    }
+    return compiled, errors, unknown_course_ids
+
+def compile_degrees(degrees, merged_map):
+    """Compiles every degree template of degrees.json. Returns {degree_id: (compiled, errors, unknown_course_ids)}."""
+    return {
+        degree_id: compile_degree(degree_id, template, merged_map)
+        for degree_id, template in degrees.items() if degree_id not in NON_DEGREE_KEYS
+    }
+
+def report_degree_problems(degree_id, errors, unknown_course_ids):
+    for error in errors:
+        print(f"Error: {degree_id}: {error}")
+    for course_id, references in sorted(unknown_course_ids.items()):
+        print(f"Warning: {degree_id}: unknown course {course_id} in {', '.join(references)}")
+
+def write_compiled_degrees(output_dir, merged_map, degrees_filepath):
+    """
+    Compiles degrees_filepath (a degrees.json) against merged_map and writes
+    compiled_degrees/<degree id>.json (minified) to output_dir, usually a staging
+    directory. Plans of degrees that no longer exist are removed when publishing.
+    Returns (error_count, unknown_course_count), or None if there is no degrees.json.
+    """
+    try:
+        with open(degrees_filepath, "r", encoding="utf-8") as f:
+            degrees = json.load(f)
+    except FileNotFoundError:
+        print(f"No {degrees_filepath}; skipping degree compilation.")
+        return None
+
+    compiled_dir = Path(output_dir) / COMPILED_DEGREES_DIRNAME
+    error_count = unknown_course_count = 0
+    compiled_degrees = compile_degrees(degrees, merged_map)
+    for degree_id, (compiled, errors, unknown_course_ids) in compiled_degrees.items():
+        report_degree_problems(degree_id, errors, unknown_course_ids)
+        error_count += len(errors)
+        unknown_course_count += len(unknown_course_ids)
+        write_minified_json(compiled_dir / f"{degree_id}.json", compiled)
+    print(f"Compiled {len(compiled_degrees)} degrees to {compiled_dir} "
+          f"({error_count} errors, {unknown_course_count} unknown courses).")
+    return error_count, unknown_course_count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Validate degrees.json against merged_courses.json and compile each degree's rules into "
+                    "compiled_degrees/<degree id>.json. update_semesters.py runs this after every rebuild; run it "
+                    "directly after editing degrees.json."
+    )
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_PUBLIC_DATA_DIR,
+                        help="Directory holding degrees.json and merged_courses.json (default: public/data).")
+    parser.add_argument("--strict", action="store_true",
+                        help="Also fail when a degree refers to course ids missing from merged_courses.json.")
+    args = parser.parse_args(argv)
+
+    with open(args.data_dir / MERGED_COURSES_FILENAME, "r", encoding="utf-8") as f:
+        merged_map = json.load(f)
+    staging_dir = create_staging_dir(args.data_dir)
+    result = write_compiled_degrees(staging_dir, merged_map, args.data_dir / DEGREES_FILENAME)
+    if result is None:
+        discard_staging_dir(staging_dir)
+        return 1
+    compress_staged_files(staging_dir)
+    replaced, unchanged, removed = publish_staged_files(staging_dir, args.data_dir, (COMPILED_DEGREES_DIRNAME,))
+    print(f"Published to {args.data_dir}: {replaced} files replaced, {unchanged} unchanged, {removed} removed.")
+    error_count, unknown_course_count = result
+    return 1 if error_count or (args.strict and unknown_course_count) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
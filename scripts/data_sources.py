@@ -0,0 +1,131 @@
+import io
+import os
+from email.utils import formatdate
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from local_mirror import file_etag, start_mirror
+
+# Upstream locations of the SAP info fetcher (https://github.com/michael-maltsev/technion-sap-info-fetcher)
+REMOTE_LAST_SEMESTERS_BASE_URL = "https://michael-maltsev.github.io/technion-sap-info-fetcher"
+REMOTE_COURSES_BASE_URL = "https://raw.githubusercontent.com/michael-maltsev/technion-sap-info-fetcher/gh-pages"
+
+# URLs under this prefix are routed to LocalDirectoryAdapter by the directory backend
+LOCAL_URL_PREFIX = "local://"
+LOCAL_BASE_URL = f"{LOCAL_URL_PREFIX}data"
+
+DATA_SOURCE_KINDS = ("remote", "directory", "mirror")
+
+class LocalDirectoryAdapter(BaseAdapter):
+    """
+    requests transport adapter serving local:// URLs from a directory, with the
+    same ETag/Last-Modified validators and 304 answers as the mirror server, so
+    the fetch code runs unchanged against files on disk.
+    """
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = Path(directory)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(b"")
+
+        path = self.directory / unquote(urlsplit(request.url).path).lstrip("/")
+        if request.method not in ("GET", "HEAD"):
+            response.status_code = 405
+            return response
+        try:
+            stat_result = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            response.status_code = 404
+            return response
+
+        etag = file_etag(stat_result)
+        response.headers = CaseInsensitiveDict({
+            "ETag": etag,
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "Content-Length": str(stat_result.st_size),
+        })
+        if request.headers.get("If-None-Match") == etag:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            if request.method == "GET":
+                if stream:
+                    response.raw = open(path, "rb")
+                else:
+                    response.raw = io.BytesIO(path.read_bytes())
+        return response
+
+    def close(self):
+        pass
+
+class DataSource:
+    """
+    Where last_semesters.json and the courses_YYYY_SSS.json files come from.
+    Every backend is reached through URLs fetched with the shared requests
+    session, so conditional requests, streaming and parallel downloads behave
+    the same for all of them. Close the source when done (or use it as a
+    context manager) to stop a mirror server it started.
+    """
+    def __init__(self, description, last_semesters_base_url, courses_base_url, adapter=None, server=None):
+        self.description = description
+        self.last_semesters_base_url = last_semesters_base_url.rstrip("/")
+        self.courses_base_url = courses_base_url.rstrip("/")
+        self.adapter = adapter
+        self.server = server
+
+    def last_semesters_url(self):
+        return f"{self.last_semesters_base_url}/last_semesters.json"
+
+    def courses_url(self, year, mapped_sem_code):
+        return f"{self.courses_base_url}/courses_{year}_{mapped_sem_code}.json"
+
+    def mount(self, session):
+        """Routes this source's URLs through its adapter, if it has one."""
+        if self.adapter:
+            session.mount(LOCAL_URL_PREFIX, self.adapter)
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def remote_data_source(base_url=None):
+    """The SAP info fetcher on GitHub, or a mirror at base_url serving both kinds of files side by side."""
+    if base_url:
+        return DataSource(f"HTTP mirror {base_url}", base_url, base_url)
+    return DataSource("SAP info fetcher (GitHub)", REMOTE_LAST_SEMESTERS_BASE_URL, REMOTE_COURSES_BASE_URL)
+
+def directory_data_source(directory):
+    """Files read straight from directory, e.g. the bundled public/data fixtures."""
+    return DataSource(f"directory {directory}", LOCAL_BASE_URL, LOCAL_BASE_URL, adapter=LocalDirectoryAdapter(directory))
+
+def mirror_data_source(directory, **mirror_options):
+    """Starts the bundled local_mirror server for directory and fetches from it over HTTP."""
+    server = start_mirror(directory, **mirror_options)
+    return DataSource(f"local mirror of {directory} at {server.base_url}", server.base_url, server.base_url, server=server)
+
+def create_data_source(kind, directory=None, base_url=None):
+    if kind == "remote":
+        return remote_data_source(base_url)
+    elif kind == "directory":
+        return directory_data_source(directory)
+    elif kind == "mirror":
+        return mirror_data_source(directory)
+    raise ValueError(f"Unknown data source '{kind}', expected one of {', '.join(DATA_SOURCE_KINDS)}")
@@ -0,0 +1,111 @@
+import argparse
+import functools
+import os
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_MIRROR_DIR = SCRIPTS_DIR.parent / "public" / "data"
+
+def file_etag(stat_result):
+    """ETag derived from a file's mtime and size, as nginx computes it."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+class MirrorRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves a directory laid out like the SAP info fetcher (last_semesters.json and
+    courses_YYYY_SSS.json side by side). On top of SimpleHTTPRequestHandler's
+    Last-Modified/If-Modified-Since it answers If-None-Match with 304, and it can
+    delay every response and fail the first requests for each path with 503 so
+    fetch concurrency and retries can be exercised deterministically.
+    """
+    etag = None
+
+    def send_head(self):
+        self.etag = None # The handler is reused for every request on a keep-alive connection
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.should_fail(self.path):
+            self.send_error(HTTPStatus.SERVICE_UNAVAILABLE, "Injected failure")
+            return None
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            self.etag = file_etag(os.stat(path))
+            if self.headers.get("If-None-Match") == self.etag:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address, directory, delay=0.0, fail_first=0, verbose=False):
+        super().__init__(server_address, functools.partial(MirrorRequestHandler, directory=str(directory)))
+        self.delay = delay
+        self.fail_first = fail_first
+        self.verbose = verbose
+        self._request_counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self, path):
+        """Returns True for the first fail_first requests of every path."""
+        with self._lock:
+            count = self._request_counts.get(path, 0)
+            self._request_counts[path] = count + 1
+        return count < self.fail_first
+
+def start_mirror(directory=DEFAULT_MIRROR_DIR, host="127.0.0.1", port=0, delay=0.0, fail_first=0, verbose=False):
+    """
+    Starts a MirrorServer for directory on a background thread and returns it;
+    port 0 picks a free port (see server.base_url). Stop it with shutdown() and
+    server_close().
+    """
+    server = MirrorServer((host, port), directory, delay=delay, fail_first=fail_first, verbose=verbose)
+    threading.Thread(target=server.serve_forever, name="local-mirror", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve a directory of semester files over HTTP as a stand-in for the SAP info fetcher."
+    )
+    parser.add_argument("--dir", type=Path, default=DEFAULT_MIRROR_DIR,
+                        help="Directory holding last_semesters.json and courses_YYYY_SSS.json (default: public/data).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="Seconds to wait before answering each request.")
+    parser.add_argument("--fail-first", type=int, default=0,
+                        help="Answer the first N requests for every path with 503 Service Unavailable.")
+    args = parser.parse_args(argv)
+
+    server = MirrorServer((args.host, args.port), args.dir, delay=args.delay, fail_first=args.fail_first, verbose=True)
+    print(f"Serving {args.dir} at {server.base_url} (update_semesters.py --base-url {server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
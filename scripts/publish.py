@@ -0,0 +1,208 @@
+import filecmp
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+try:
+    import brotli # Optional; without it only .gz siblings are written
+except ImportError:
+    brotli = None
+
+# Generated files are written here inside the output directory (so os.replace never
+# crosses filesystems) and moved into place by publish_staged_files
+STAGING_DIRNAME = ".staging"
+
+# Precompressed siblings (<file>.gz, <file>.br) are written for files of at least this size
+COMPRESS_MIN_BYTES = 1024
+GZIP_COMPRESS_LEVEL = 9
+BROTLI_QUALITY = 11
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+# Generated files the app loads are published under content-hashed names
+# (course_details/001.<hash>.json, courses_index.<hash>.json), so a new file never
+# overwrites one a reader may still need. This index maps each logical path to its
+# hashed name and is replaced last, which switches readers to the new set of files
+# in one os.replace. Files of the previous index are kept for one more publish, so
+# readers that loaded it just before the switch can still fetch them.
+DATA_INDEX_FILENAME = "data_index.json"
+CONTENT_HASH_LENGTH = 12
+
+def serialize_json(data):
+    """Minified JSON with sorted keys, so the same data always yields the same bytes."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+def write_minified_json(filename, data):
+    filename = Path(filename)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_bytes(serialize_json(data))
+
+def create_staging_dir(output_dir):
+    """Returns an empty staging directory for output_dir, discarding what an interrupted run left behind."""
+    staging_dir = Path(output_dir) / STAGING_DIRNAME
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+    return staging_dir
+
+def discard_staging_dir(staging_dir):
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+def iter_staged_files(staging_dir):
+    """Yields the path of every staged file relative to staging_dir, sorted."""
+    for path in sorted(Path(staging_dir).rglob("*")):
+        if path.is_file():
+            yield path.relative_to(staging_dir)
+
+def write_compressed_siblings(path):
+    """
+    Writes .gz (and, with the brotli package, .br) siblings next to path if it has
+    at least COMPRESS_MIN_BYTES and the compressed form is smaller. The gzip header
+    carries no name or timestamp, so unchanged content compresses to unchanged
+    bytes. Returns the number of siblings written.
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return 0
+    siblings = {".gz": gzip.compress(data, compresslevel=GZIP_COMPRESS_LEVEL, mtime=0)}
+    if brotli:
+        siblings[".br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    sibling_count = 0
+    for suffix, compressed in siblings.items():
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+            sibling_count += 1
+    return sibling_count
+
+def compress_staged_files(staging_dir):
+    """Writes compressed siblings for every staged file. Returns the number of siblings written."""
+    if not brotli:
+        print("Warning: The brotli package is not installed; only .gz siblings are written, "
+              "and .br siblings from earlier runs are removed when publishing (pip install brotli).")
+    return sum(write_compressed_siblings(Path(staging_dir) / relative_path)
+               for relative_path in list(iter_staged_files(staging_dir))
+               if relative_path.suffix not in COMPRESSED_SUFFIXES)
+
+def get_content_hashed_path(relative_path, data):
+    """course_details/001.json -> course_details/001.<first CONTENT_HASH_LENGTH hex digits of its SHA-256>.json"""
+    content_hash = hashlib.sha256(data).hexdigest()[:CONTENT_HASH_LENGTH]
+    return relative_path.with_name(f"{relative_path.stem}.{content_hash}{relative_path.suffix}")
+
+def load_data_index(output_dir):
+    """Returns the published data index of output_dir ({logical path: hashed path}), empty if there is none."""
+    try:
+        with open(Path(output_dir) / DATA_INDEX_FILENAME, "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return {}
+
+def resolve_published_path(output_dir, relative_path):
+    """Returns where the file published for a logical path such as timetables/202401.json is, or None."""
+    hashed_path = load_data_index(output_dir).get(Path(relative_path).as_posix())
+    return Path(output_dir) / hashed_path if hashed_path else None
+
+def replace_if_changed(source, destination):
+    """Moves source to destination with os.replace unless destination already has the same content. Returns whether it did."""
+    if destination.is_file() and filecmp.cmp(source, destination, shallow=False):
+        return False
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, destination)
+    return True
+
+def is_published_variant(filename, logical_name):
+    """Whether filename is logical_name, its content-hashed name or a .gz/.br sibling of either."""
+    stem, suffix = os.path.splitext(logical_name)
+    compressed = "|".join(re.escape(suffix) for suffix in COMPRESSED_SUFFIXES)
+    pattern = rf"{re.escape(stem)}(\.[0-9a-f]{{{CONTENT_HASH_LENGTH}}})?{re.escape(suffix)}({compressed})?"
+    return re.fullmatch(pattern, filename) is not None
+
+def publish_staged_files(staging_dir, output_dir, generated_subdirs=(), generated_files=()):
+    """
+    Publishes the staged files to output_dir in an order that never shows a reader
+    a half-updated set of generated files:
+
+    1. Files in generated_subdirs and the top-level generated_files, with their
+       .gz/.br siblings, go to content-hashed names (see get_content_hashed_path).
+       New content gets a new name, so nothing the current index refers to is touched.
+    2. Other files are replaced one by one with os.replace, so each is swapped whole.
+    3. DATA_INDEX_FILENAME, mapping the logical path of every hashed file to its
+       hashed name, is replaced last. Entries for files not published by this call
+       (e.g. of other subdirectories) are kept from the published index.
+    4. Stale files are removed: variants of the hashed files that neither the new
+       nor the previous index refers to, and .gz/.br siblings of other staged files
+       that no longer have one.
+
+    Files whose content did not change are left untouched, which keeps their mtime
+    and ETag. An interrupted publish leaves the old index and the files it refers
+    to in place. The staging directory is removed at the end.
+    Returns (replaced, unchanged, removed) file counts.
+    """
+    staging_dir = Path(staging_dir)
+    output_dir = Path(output_dir)
+    staged_paths = list(iter_staged_files(staging_dir))
+    replaced = unchanged = removed = 0
+
+    def is_generated(relative_path):
+        if len(relative_path.parts) == 1:
+            return any(is_published_variant(relative_path.name, name) for name in generated_files)
+        return relative_path.parts[0] in generated_subdirs
+
+    destinations = {}
+    data_index = {}
+    for relative_path in staged_paths:
+        if is_generated(relative_path) and relative_path.suffix not in COMPRESSED_SUFFIXES:
+            hashed_path = get_content_hashed_path(relative_path, (staging_dir / relative_path).read_bytes())
+            data_index[relative_path.as_posix()] = hashed_path.as_posix()
+            for suffix in ("",) + COMPRESSED_SUFFIXES:
+                sibling = relative_path.with_name(relative_path.name + suffix)
+                if (staging_dir / sibling).is_file():
+                    destinations[sibling] = hashed_path.with_name(hashed_path.name + suffix)
+    for relative_path in staged_paths:
+        destinations.setdefault(relative_path, relative_path)
+
+    previous_index = load_data_index(output_dir)
+    kept_paths = set()
+    if generated_subdirs or generated_files:
+        for path, hashed_path in previous_index.items():
+            if is_generated(Path(path)):
+                # Still referenced by readers that loaded the previous index
+                kept_paths.update(Path(hashed_path + suffix) for suffix in ("",) + COMPRESSED_SUFFIXES)
+            else:
+                data_index[path] = hashed_path
+        data_index_filepath = staging_dir / DATA_INDEX_FILENAME
+        write_minified_json(data_index_filepath, {"files": data_index})
+        write_compressed_siblings(data_index_filepath)
+        index_paths = [path for path in (Path(DATA_INDEX_FILENAME + suffix) for suffix in COMPRESSED_SUFFIXES + ("",))
+                       if (staging_dir / path).is_file()]
+        destinations.update((path, path) for path in index_paths)
+        staged_paths = [path for path in staged_paths if path not in index_paths] + index_paths
+
+    # Generated files first, then the other files, and the index (staged last) after them
+    for relative_path in sorted(staged_paths, key=lambda path: not is_generated(path)):
+        if replace_if_changed(staging_dir / relative_path, output_dir / destinations[relative_path]):
+            replaced += 1
+        else:
+            unchanged += 1
+
+    published_path_set = set(destinations.values())
+    stale_paths = []
+    for subdir in generated_subdirs:
+        if (output_dir / subdir).is_dir():
+            stale_paths.extend(path.relative_to(output_dir) for path in (output_dir / subdir).iterdir() if path.is_file())
+    stale_paths.extend(path.relative_to(output_dir) for path in output_dir.iterdir()
+                       if path.is_file() and any(is_published_variant(path.name, name) for name in generated_files))
+    stale_paths = [path for path in stale_paths if path not in published_path_set and path not in kept_paths]
+    for relative_path in published_path_set:
+        if relative_path.suffix not in COMPRESSED_SUFFIXES and not is_generated(relative_path):
+            stale_paths.extend(sibling for sibling in (relative_path.with_name(relative_path.name + suffix)
+                                                       for suffix in COMPRESSED_SUFFIXES)
+                               if sibling not in published_path_set and (output_dir / sibling).is_file())
+    for relative_path in sorted(set(stale_paths)):
+        (output_dir / relative_path).unlink()
+        removed += 1
+
+    discard_staging_dir(staging_dir)
+    return replaced, unchanged, removed
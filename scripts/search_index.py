@@ -0,0 +1,52 @@
+import re
+
+# Course search index: sorted ids for prefix lookup plus n-gram posting lists over
+# the normalized name and lecturer, queried by src/utils/courseSearch.ts
+SEARCH_INDEX_FILENAME = "search_index.json"
+SEARCH_NGRAM_SIZE = 2
+SEARCH_TEXT_FIELDS = ("name", "lecturer")
+
+# Search text normalization; must match normalizeSearchText in src/utils/hebrewUtils.ts.
+# Niqqud, cantillation marks, quotes and geresh/gershayim are dropped (so ז'ורנל and
+# ז׳ורנל both become זורנל), final letters fold to their regular form, and anything
+# else that is not a Hebrew letter, Latin letter or digit separates words.
+SEARCH_DROPPED_CHARS_RE = re.compile(r'[\u0591-\u05C7\u05F3\u05F4\'"`]')
+SEARCH_SEPARATOR_RE = re.compile(r'[^0-9a-z\u05D0-\u05EA]+')
+HEBREW_FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+
+def normalize_search_text(text):
+    lowered = SEARCH_DROPPED_CHARS_RE.sub("", (text or "").lower()).translate(HEBREW_FINAL_LETTERS)
+    return SEARCH_SEPARATOR_RE.sub(" ", lowered).strip()
+
+def iter_search_ngrams(normalized_text):
+    """Yields the SEARCH_NGRAM_SIZE-grams of every word; words shorter than that yield none."""
+    for word in normalized_text.split():
+        for start in range(len(word) - SEARCH_NGRAM_SIZE + 1):
+            yield word[start:start + SEARCH_NGRAM_SIZE]
+
+def build_search_index(merged_map):
+    """
+    Builds the course search index. A course's ordinal is its position in the
+    sorted ids list, so course number prefixes are a binary search away. texts
+    holds each course's normalized name and lecturer for verifying candidates,
+    and postings maps every n-gram of those texts to the sorted ordinals of the
+    courses containing it, delta-encoded (first ordinal, then differences).
+    """
+    course_ids = sorted(merged_map)
+    texts = []
+    postings = {}
+    for ordinal, course_id in enumerate(course_ids):
+        text = normalize_search_text(" ".join(
+            merged_map[course_id].get(field) or "" for field in SEARCH_TEXT_FIELDS))
+        texts.append(text)
+        for ngram in set(iter_search_ngrams(text)):
+            postings.setdefault(ngram, []).append(ordinal)
+    return {
+        "ngram_size": SEARCH_NGRAM_SIZE,
+        "ids": course_ids,
+        "texts": texts,
+        "postings": {
+            ngram: [ordinals[0]] + [current - previous for previous, current in zip(ordinals, ordinals[1:])]
+            for ngram, ordinals in sorted(postings.items())
+        },
+    }
@@ -0,0 +1,79 @@
+import re
+
+# Per-semester timetables (timetables/<YYYYSS>.json) built from the 'schedule' section
+TIMETABLES_DIRNAME = "timetables"
+
+# Day names of the 'יום' field; a session's day is its position here (0 = Sunday)
+SCHEDULE_DAYS = ('ראשון', 'שני', 'שלישי', 'רביעי', 'חמישי', 'שישי', 'שבת')
+SCHEDULE_DAY_INDEX = {day: index for index, day in enumerate(SCHEDULE_DAYS)}
+SCHEDULE_HOURS_RE = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+MINUTES_PER_DAY = 24 * 60
+# Order of the values of every session in a timetable file
+TIMETABLE_SESSION_FIELDS = ("start", "end", "type", "building", "room", "staff", "event")
+
+def parse_schedule_hours(hours_str):
+    """Parses an 'HH:MM - HH:MM' range into (start, end) minutes since midnight, or None."""
+    match = SCHEDULE_HOURS_RE.fullmatch(hours_str.strip()) if isinstance(hours_str, str) else None
+    if not match:
+        return None
+    start = int(match.group(1)) * 60 + int(match.group(2))
+    end = int(match.group(3)) * 60 + int(match.group(4))
+    return (start, end) if start < end else None
+
+def build_semester_timetable(semester_key, schedules):
+    """
+    Builds the compact timetable of a semester from {course_id: raw schedule list}.
+    Sessions are [start, end, type, building, room, staff, event] lists where start
+    and end are minutes since Sunday 00:00 and type/building/staff index into
+    string tables; they are grouped as courses[course_id][group]. "index" holds
+    [start, end, course_id, group] for every session sorted by start, so all
+    sessions overlapping [s, e) lie between the first entry with start >= s -
+    max_session_minutes and the first with start >= e.
+    Returns (timetable, skipped_entries).
+    """
+    tables = {"types": {}, "buildings": {}, "staff": {}}
+
+    def intern(table, value):
+        value = value.strip() if isinstance(value, str) else ""
+        return tables[table].setdefault(value, len(tables[table]))
+
+    courses = {}
+    index = []
+    skipped_entries = 0
+    for course_id in sorted(schedules):
+        groups = {}
+        for entry in schedules[course_id]:
+            day = SCHEDULE_DAY_INDEX.get(entry.get('יום'))
+            hours = parse_schedule_hours(entry.get('שעה'))
+            if day is None or hours is None:
+                skipped_entries += 1
+                continue
+            session = [
+                day * MINUTES_PER_DAY + hours[0],
+                day * MINUTES_PER_DAY + hours[1],
+                intern("types", entry.get('סוג')),
+                intern("buildings", entry.get('בניין')),
+                entry.get('חדר') or 0,
+                intern("staff", entry.get('מרצה/מתרגל')),
+                entry.get('מס.'),
+            ]
+            groups.setdefault(str(entry.get('קבוצה')), []).append(session)
+        if not groups:
+            continue
+        courses[course_id] = {}
+        for group in sorted(groups, key=lambda group: (len(group), group)):
+            sessions = sorted(groups[group])
+            courses[course_id][group] = sessions
+            index.extend([session[0], session[1], course_id, group] for session in sessions)
+    index.sort()
+
+    timetable = {
+        "semester": semester_key,
+        "days": SCHEDULE_DAYS,
+        "session_fields": TIMETABLE_SESSION_FIELDS,
+        **{table: list(values) for table, values in tables.items()},
+        "courses": courses,
+        "index": index,
+        "max_session_minutes": max((end - start for start, end, _, _ in index), default=0),
+    }
+    return timetable, skipped_entries
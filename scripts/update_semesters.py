@@ -1,23 +1,439 @@
+import argparse
+import codecs
+import cProfile
+import hashlib
+import inspect
 import json
 import re
 import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from compile_degrees import COMPILED_DEGREES_DIRNAME, DEGREES_FILENAME, write_compiled_degrees
+from data_sources import DATA_SOURCE_KINDS, create_data_source, remote_data_source
+from publish import (
+    compress_staged_files,
+    create_staging_dir,
+    discard_staging_dir,
+    DATA_INDEX_FILENAME,
+    load_data_index,
+    publish_staged_files,
+    resolve_published_path,
+    serialize_json,
+    write_minified_json,
+)
+from search_index import SEARCH_INDEX_FILENAME, SEARCH_NGRAM_SIZE, build_search_index
+from timetables import TIMETABLES_DIRNAME, build_semester_timetable
+
+# Number of semester files downloaded in parallel (overridable with --workers)
+DEFAULT_FETCH_WORKERS = 4
+
+# Every request is bounded: (connect, read) seconds, the read timeout applying to
+# each socket read, so a stuck connection fails instead of stalling the refresh
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+# Attempts per file for timeouts, dropped connections and 5xx/429 answers, with
+# exponential backoff between them (1s, 2s, 4s, ... capped)
+DEFAULT_FETCH_ATTEMPTS = 4
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_MAX_BACKOFF_SECONDS = 30.0
+TRANSIENT_HTTP_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Where semester data is fetched from unless another data source is passed in
+DEFAULT_DATA_SOURCE = remote_data_source()
+
+# Output directory, and the fixtures read by the directory and mirror data sources
+DEFAULT_PUBLIC_DATA_DIR = Path("public/data")
+
+# Scripts whose code shapes the generated files; editing any of them invalidates
+# the "up to date" check of compute_inputs_signature
+SCRIPTS_DIR = Path(__file__).resolve().parent
+OUTPUT_CODE_FILENAMES = ("update_semesters.py", "search_index.py", "timetables.py", "compile_degrees.py", "publish.py")
+
+# The degree templates compiled into compiled_degrees/; it is maintained in the
+# repository, so it is read from public/data whatever --output-dir is
+DEFAULT_DEGREES_FILEPATH = DEFAULT_PUBLIC_DATA_DIR / DEGREES_FILENAME
+
+# Records ETag/Last-Modified and content hashes of the fetched files and the state of
+# the last run. Kept outside public/ so it is never deployed with the site.
+DEFAULT_MANIFEST_PATH = Path(".cache/update_manifest.json")
+
+# Fields the planner needs at startup; they go to the slim courses_index.json.
+# Every other course field (syllabus, notes, exams...) goes to a detail shard.
+COURSE_INDEX_FIELDS = ("name", "credits", "prereqTree", "semesters", "no_credit_courses", "isClassificationCourse")
+COURSE_INDEX_FILENAME = "courses_index.json"
+COURSE_DETAILS_DIRNAME = "course_details"
+# Detail shards are bucketed by this many leading digits of the course id (roughly the faculty)
+COURSE_DETAIL_SHARD_PREFIX_LENGTH = 3
+# Equivalence sets, precomputed for the planner and loaded at startup
+COURSE_INDEXES_FILENAME = "course_indexes.json"
+# Reverse prerequisite map, loaded only when a course's details are shown
+COURSE_UNLOCKS_FILENAME = "course_unlocks.json"
+
+# Everything the app loads is published under content-hashed names behind
+# data_index.json (see publish.py), so a reader never mixes two runs' files.
+# merged_courses.json and last_semesters.json keep fixed names: the app does not
+# load them, and scripts and data sources read them by name.
+GENERATED_SUBDIRS = (COURSE_DETAILS_DIRNAME, TIMETABLES_DIRNAME, COMPILED_DEGREES_DIRNAME)
+GENERATED_FILENAMES = (COURSE_INDEX_FILENAME, COURSE_INDEXES_FILENAME, COURSE_UNLOCKS_FILENAME, SEARCH_INDEX_FILENAME)
+
+# Parsed semester course maps, pickled between runs so a rebuild after an override
+# change skips decoding and parsing. Kept outside public/ so it is never deployed.
+DEFAULT_BUILD_CACHE_DIR = Path(".cache/semester_maps")
+BUILD_CACHE_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
 
-def get_last_semesters():
-    last_semesters_url = "https://michael-maltsev.github.io/technion-sap-info-fetcher/last_semesters.json"
-    last_semesters_sap = requests.get(last_semesters_url).json()
-
-    last_semesters = {}
-    for last_semester in last_semesters_sap:
-        semester_code_val = last_semester["semester"] # 200 for Winter, 201 for Spring, 202 for Summer
-        # Create YYYYSS format where SS is 01 (Winter), 02 (Spring), 03 (Summer)
-        semester_suffix = str(semester_code_val - 200 + 1).zfill(2)
-        semester_key = str(last_semester["year"]) + semester_suffix
-        last_semesters[semester_key] = {
-            "start": last_semester["start"],
-            "end": last_semester["end"],
+# Size of the byte chunks semester files are downloaded and decoded in
+JSON_STREAM_CHUNK_SIZE = 1 << 16
+JSON_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+class PipelineMetrics:
+    """
+    Collects wall time, bytes and item counts per pipeline stage (and per
+    semester where it applies) plus named counters and value distributions,
+    for the JSON report written with --report. Stage timing is always cheap;
+    records and counters are only kept when enabled.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.stages = []
+        self.counters = {}
+        self.distributions = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, semester=None):
+        record = {"stage": name, "semester": semester, "seconds": 0.0, "bytes": 0, "items": 0}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            if self.enabled:
+                with self._lock:
+                    self.stages.append(record)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        if self.enabled:
+            with self._lock:
+                histogram = self.distributions.setdefault(name, {})
+                histogram[value] = histogram.get(value, 0) + 1
+
+    def build_report(self):
+        stage_totals = {}
+        for record in self.stages:
+            totals = stage_totals.setdefault(record["stage"], {"runs": 0, "seconds": 0.0, "bytes": 0, "items": 0})
+            totals["runs"] += 1
+            totals["seconds"] += record["seconds"]
+            totals["bytes"] += record["bytes"]
+            totals["items"] += record["items"]
+        distributions = {}
+        for name, histogram in self.distributions.items():
+            samples = sum(histogram.values())
+            total = sum(value * occurrences for value, occurrences in histogram.items())
+            distributions[name] = {
+                "samples": samples,
+                "total": total,
+                "max": max(histogram),
+                "mean": total / samples,
+                "histogram": {str(value): histogram[value] for value in sorted(histogram)},
+            }
+        cache_info = prereq_parse_cache_info()
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "total_seconds": time.perf_counter() - self._started,
+            "stage_totals": stage_totals,
+            "stages": self.stages,
+            "counters": dict(sorted(self.counters.items())),
+            "distributions": distributions,
+            "prereq_parse_cache": {"hits": cache_info.hits, "misses": cache_info.misses, "size": cache_info.currsize},
         }
-    return last_semesters
+
+    def write_report(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.build_report(), f, ensure_ascii=False, indent=4)
+        print(f"Wrote pipeline metrics report to {filename}")
+
+# Shared by every stage of a run; enabled by --report
+metrics = PipelineMetrics()
+
+def timed_iter(iterable, record, key):
+    """Yields from iterable, adding the time spent producing each item to record[key]."""
+    iterator = iter(iterable)
+    record.setdefault(key, 0.0)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            record[key] += time.perf_counter() - start
+            return
+        record[key] += time.perf_counter() - start
+        yield item
+
+def create_http_session(max_workers=DEFAULT_FETCH_WORKERS, data_source=None):
+    """
+    Creates a single requests.Session shared by all downloads, so that every
+    fetch reuses pooled keep-alive connections instead of paying for a new
+    TLS handshake per semester. The pool is sized to the number of workers.
+    A data_source with its own transport (e.g. a local directory) is mounted too.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_workers))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if data_source:
+        data_source.mount(session)
+    return session
+
+def compute_file_sha256(filename):
+    """Returns the hex SHA-256 of a file's content, or None if the file does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def load_manifest(manifest_path, public_data_dir):
+    """
+    Loads the manifest of public_data_dir. A manifest recorded for another output
+    directory describes files that are not there, so it is replaced by an empty one.
+    """
+    output_dir = str(Path(public_data_dir).resolve())
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    if manifest and manifest.get("output_dir") != output_dir:
+        print(f"{manifest_path} was recorded for {manifest.get('output_dir')}; starting a new manifest for {output_dir}.")
+        manifest = {}
+    manifest["output_dir"] = output_dir
+    manifest.setdefault("files", {})
+    manifest.setdefault("merged_courses", {})
+    return manifest
+
+def save_manifest(manifest_path, manifest):
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = manifest_path.with_name(manifest_path.name + ".part")
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4, sort_keys=True)
+    os.replace(partial_path, manifest_path)
+
+class TransientHTTPError(RuntimeError):
+    """An HTTP status worth retrying (see TRANSIENT_HTTP_STATUSES)."""
+
+RETRYABLE_FETCH_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    TransientHTTPError,
+)
+
+def call_with_retries(description, fetch, attempts=DEFAULT_FETCH_ATTEMPTS):
+    """
+    Calls fetch() until it succeeds or attempts are used up, sleeping with
+    exponential backoff after each retryable error (RETRYABLE_FETCH_ERRORS).
+    Other exceptions, and the last retryable one, propagate to the caller.
+    """
+    for attempt in range(1, max(1, attempts) + 1):
+        try:
+            return fetch()
+        except RETRYABLE_FETCH_ERRORS as e:
+            if attempt >= attempts:
+                raise
+            delay = min(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1), RETRY_MAX_BACKOFF_SECONDS)
+            print(f"Fetching {description} failed ({e}); retrying in {delay:g}s (attempt {attempt + 1} of {attempts}).")
+            metrics.count("fetch_retries")
+            time.sleep(delay)
+
+def conditional_get(http, url, filename, manifest_entry, stream=False, timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+    """
+    GETs url, adding If-None-Match/If-Modified-Since from manifest_entry when the
+    local copy of the file still matches the content hash recorded for it.
+    A missing or locally modified file is always downloaded in full.
+    Raises TransientHTTPError for statuses worth retrying.
+    """
+    headers = {}
+    if manifest_entry and manifest_entry.get("url") == url and compute_file_sha256(filename) == manifest_entry.get("sha256"):
+        if manifest_entry.get("etag"):
+            headers["If-None-Match"] = manifest_entry["etag"]
+        if manifest_entry.get("last_modified"):
+            headers["If-Modified-Since"] = manifest_entry["last_modified"]
+    response = http.get(url, headers=headers, stream=stream, timeout=timeout)
+    if response.status_code in TRANSIENT_HTTP_STATUSES:
+        response.close()
+        raise TransientHTTPError(f"HTTP {response.status_code} for {url}")
+    return response
+
+def build_manifest_entry(url, response, sha256):
+    return {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": sha256,
+    }
+
+def save_response_stream(response, filename):
+    """
+    Writes a streamed response body to filename chunk by chunk, exactly as
+    received, and returns (sha256, byte_count). The data goes to a temporary
+    .part file first so an interrupted download never leaves a truncated file.
+    """
+    digest = hashlib.sha256()
+    byte_count = 0
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    partial_filename = f"{filename}.part"
+    with open(partial_filename, "wb") as f:
+        for chunk in response.iter_content(chunk_size=JSON_STREAM_CHUNK_SIZE):
+            f.write(chunk)
+            digest.update(chunk)
+            byte_count += len(chunk)
+    os.replace(partial_filename, filename)
+    return digest.hexdigest(), byte_count
+
+def iter_json_array(chunks):
+    """
+    Incrementally decodes a top-level JSON array from an iterable of byte chunks,
+    yielding its elements one at a time. Only the undecoded remainder of the
+    current chunk is kept in memory, never the whole document.
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    chunk_iter = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read_more():
+        # Drops the consumed part of the buffer and appends the next chunk. Returns False once exhausted.
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = next(chunk_iter, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + utf8_decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + utf8_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    def peek():
+        # Skips whitespace and returns the next character, or "" at the end of the input.
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE_RE.match(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                return ""
+
+    if peek() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if peek() == "]":
+        return
+    while True:
+        peek()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise
+                continue
+            # A scalar cut by a chunk boundary (e.g. "2" of "2.5") decodes but is not followed by a delimiter
+            if (end == len(buffer) or buffer[end] not in ",] \t\n\r") and read_more():
+                continue
+            break
+        pos = end
+        yield item
+
+        separator = peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}")
+        pos += 1
+
+def iter_saved_courses(filename):
+    """Yields the courses of a saved courses_*.json file one at a time."""
+    with open(filename, "rb") as f:
+        yield from iter_json_array(iter(lambda: f.read(JSON_STREAM_CHUNK_SIZE), b""))
+
+def get_last_semesters(session=None, filename=None, manifest_entry=None, data_source=None,
+                       timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), attempts=DEFAULT_FETCH_ATTEMPTS):
+    """
+    Fetches the list of available semesters from data_source (default: the SAP
+    info fetcher), retrying transient failures. When filename and manifest_entry
+    are given the request is conditional; on 304 Not Modified the previously
+    published file is reused. The caller publishes the result; the returned
+    manifest entry holds the hash of its serialize_json form.
+    Returns (last_semesters, manifest_entry, changed).
+    """
+    last_semesters_url = (data_source or DEFAULT_DATA_SOURCE).last_semesters_url()
+    http = session or create_http_session(1, data_source)
+
+    def fetch():
+        response = conditional_get(http, last_semesters_url, filename, manifest_entry if filename else None, timeout=timeout)
+        response.content # Reads the body inside the retry loop
+        return response
+
+    with metrics.stage("fetch_last_semesters") as stage:
+        response = call_with_retries("last_semesters.json", fetch, attempts)
+        stage["status"] = response.status_code
+        stage["bytes"] = len(response.content)
+    if response.status_code == 304:
+        with open(filename, "r", encoding="utf-8") as f:
+            return json.load(f), manifest_entry, False
+    response.raise_for_status()
+    last_semesters_sap = response.json()
+
+    if isinstance(last_semesters_sap, dict):
+        # Already in the {"YYYYSS": {"start": ..., "end": ...}} form published by run_update, e.g. a public/data fixture
+        last_semesters = {
+            semester_key: {"start": dates["start"], "end": dates["end"]}
+            for semester_key, dates in last_semesters_sap.items()
+        }
+    else:
+        last_semesters = {}
+        for last_semester in last_semesters_sap:
+            semester_code_val = last_semester["semester"] # 200 for Winter, 201 for Spring, 202 for Summer
+            # Create YYYYSS format where SS is 01 (Winter), 02 (Spring), 03 (Summer)
+            semester_suffix = str(semester_code_val - 200 + 1).zfill(2)
+            semester_key = str(last_semester["year"]) + semester_suffix
+            last_semesters[semester_key] = {
+                "start": last_semester["start"],
+                "end": last_semester["end"],
+            }
+
+    if not filename:
+        return last_semesters, None, True
+    new_entry = build_manifest_entry(last_semesters_url, response, hashlib.sha256(serialize_json(last_semesters)).hexdigest())
+    changed = not manifest_entry or manifest_entry.get("sha256") != new_entry["sha256"]
+    return last_semesters, new_entry, changed
 
 # New helper function to get Hebrew semester label
 def get_semester_label(semester_suffix):
@@ -45,33 +461,113 @@ def map_semester_code(semester_key): # semester_key is "YYYYSS"
         raise ValueError(f"Unknown semester suffix in semester code: {sem_suffix} from {semester_key}")
     return year, mapped_sem_code
 
-def fetch_and_save_courses(semester_key, filename): # semester_key is "YYYYSS"
+def fetch_and_save_courses(semester_key, filename, session=None, manifest_entry=None, data_source=None,
+                           timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), attempts=DEFAULT_FETCH_ATTEMPTS): # semester_key is "YYYYSS"
+    """
+    Streams a semester's courses to filename without decoding them; the file is
+    parsed later with iter_saved_courses. Returns (downloaded, manifest_entry),
+    where downloaded is False when the server answered 304 Not Modified and the
+    saved file is still current. Timeouts, dropped connections (also mid-body)
+    and transient statuses are retried; an interrupted body never replaces the
+    saved file (see save_response_stream).
+    """
     year, mapped_sem_code = map_semester_code(semester_key)
-    courses_url = f"https://raw.githubusercontent.com/michael-maltsev/technion-sap-info-fetcher/gh-pages/courses_{year}_{mapped_sem_code}.json"
-    response = requests.get(courses_url)
-    if response.status_code == 200:
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(response.json(), f, ensure_ascii=False, indent=4)
-        return response.json()
-    else:
+    courses_url = (data_source or DEFAULT_DATA_SOURCE).courses_url(year, mapped_sem_code)
+    http = session or create_http_session(1, data_source)
+
+    def fetch():
+        with metrics.stage("download", semester_key) as stage, \
+                conditional_get(http, courses_url, filename, manifest_entry, stream=True, timeout=timeout) as response:
+            stage["status"] = response.status_code
+            if response.status_code == 304:
+                return False, manifest_entry
+            elif response.status_code == 200:
+                sha256, stage["bytes"] = save_response_stream(response, filename)
+                return True, build_manifest_entry(courses_url, response, sha256)
         # It's better to raise an error if a semester's data isn't found, to be handled by the caller
         raise RuntimeError(f"Failed to fetch courses for semester {semester_key} (URL: {courses_url}): HTTP {response.status_code}")
 
+    return call_with_retries(f"courses for semester {semester_key}", fetch, attempts)
+
+# Matches the per-semester files written by get_semester_data_filename, but not
+# derived files such as courses_index.json
+SEMESTER_DATA_FILE_GLOB = "courses_[0-9]*_[0-9]*.json"
+
+def get_semester_data_filename(public_data_dir, semester_key):
+    year, mapped_sem_code = map_semester_code(semester_key)
+    return Path(public_data_dir) / f"courses_{year}_{mapped_sem_code}.json"
+
+def fetch_all_semesters(semester_keys, public_data_dir, session, max_workers=DEFAULT_FETCH_WORKERS, manifest=None, data_source=None,
+                        timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT), attempts=DEFAULT_FETCH_ATTEMPTS):
+    """
+    Downloads the course files of all given semesters concurrently.
+    Returns (results, errors): results maps semester_key -> (downloaded, manifest
+    entry) and errors maps semester_key -> the exception raised while fetching it.
+    Both are keyed by semester so the caller can merge in a fixed order,
+    independent of the order in which the downloads complete.
+    """
+    manifest_files = manifest["files"] if manifest else {}
+
+    def fetch_one(semester_key):
+        semester_data_filename = get_semester_data_filename(public_data_dir, semester_key)
+        return fetch_and_save_courses(semester_key, semester_data_filename, session,
+                                      manifest_files.get(semester_data_filename.name), data_source, timeout, attempts)
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {semester_key: executor.submit(fetch_one, semester_key) for semester_key in semester_keys}
+        # Statuses are printed here, in semester order, rather than from the worker threads
+        for semester_key, future in futures.items():
+            semester_data_filename = get_semester_data_filename(public_data_dir, semester_key)
+            try:
+                results[semester_key] = future.result()
+            except Exception as e:
+                errors[semester_key] = e
+                continue
+            if not results[semester_key][0]:
+                print(f"Courses for semester {semester_key} not modified since last run ({semester_data_filename})")
+            else:
+                print(f"Fetched and saved courses for semester {semester_key} to {semester_data_filename}")
+    return results, errors
+
+# Separators padded with spaces before splitting a prerequisite string into tokens:
+# parentheses, commas, 'או' (or), 'ו-' (and) and a standalone 'ו' (and). A 'ו' is
+# standalone when it is not followed by a word character or '-', or when it is
+# directly followed by another conjunction (which gets padded itself).
+PREREQ_SEPARATOR_RE = re.compile(r'[(),]|או|ו-|ו(?=או|ו-|[^\w-]|$)')
+COURSE_ID_RE = re.compile(r'\d{8}')
+PREREQ_AND_TOKENS = frozenset(('ו', ',', 'ו-'))
+
+# Distinct prerequisite strings kept in the parse cache. The same strings repeat
+# across semesters, so a full rebuild parses each of them only once.
+PREREQ_PARSE_CACHE_SIZE = 8192
+
+def tokenize_prerequisites(prereq_str):
+    return PREREQ_SEPARATOR_RE.sub(r' \g<0> ', prereq_str).split()
+
 # Python version of parsePrerequisiteTree from courseGraph.js
 def parse_prerequisite_tree(prereq_str):
+    """
+    Parses a 'מקצועות קדם' string into an {'and': [...]}/{'or': [...]} tree.
+    Results are memoized per raw string and shared between callers, so the
+    returned tree must not be mutated.
+    """
     if not prereq_str:
         return None
+    return _parse_prerequisite_tree_cached(prereq_str)
 
-    s = prereq_str
-    s = re.sub(r'([()])', r' \1 ', s)
-    s = re.sub(r'או', ' או ', s)
-    # Separate 'ו-' as a conjunction, but not inside 'או'
-    s = re.sub(r'(?<!א)ו-', ' ו- ', s)
-    # Separate standalone 'ו' as a conjunction, but not inside 'או'
-    s = re.sub(r'(?<!א)ו(?![\w-])', ' ו ', s)
-    s = re.sub(r',', ' , ', s)
-    tokens = [t for t in s.split() if t]
+def prereq_parse_cache_info():
+    """Returns the hits/misses/currsize of the prerequisite parse cache."""
+    return _parse_prerequisite_tree_cached.cache_info()
+
+def clear_prereq_parse_cache():
+    """Empties the prerequisite parse cache, e.g. before timing cold parses."""
+    _parse_prerequisite_tree_cached.cache_clear()
+
+@lru_cache(maxsize=PREREQ_PARSE_CACHE_SIZE)
+def _parse_prerequisite_tree_cached(prereq_str):
+    tokens = tokenize_prerequisites(prereq_str)
 
     def parse_tokens(tokens):
         def parse_expr(idx):
@@ -89,10 +585,10 @@ def parse_prerequisite_tree(prereq_str):
                 elif token == 'או':
                     op = 'or'
                     idx += 1
-                elif token == 'ו' or token == ',' or token == 'ו-':
+                elif token in PREREQ_AND_TOKENS:
                     op = 'and'
                     idx += 1
-                elif re.match(r'^\d{8}$', token):
+                elif COURSE_ID_RE.fullmatch(token):
                     items.append((op, token))
                     op = None
                     idx += 1
@@ -140,7 +636,19 @@ def parse_prerequisite_tree(prereq_str):
         return None
 
 # Build a map: courseNum -> { name, prereqTree: logicTree, semesters: ["חורף", "אביב"] }
-def build_course_map(courses, semester_label):
+# Shared 'no_credit_courses' value of build_course_map for courses without any
+EMPTY_ID_SET = frozenset()
+
+def build_course_map(courses, semester_label, stats=None):
+    """
+    Builds the course map of a single semester. 'no_credit_courses' and
+    'semesters' are kept as frozensets so that merging stays a single pass; call
+    finalize_course_map once before serializing. Courses without no-credit IDs
+    share one empty frozenset and all courses share the semester's frozenset,
+    so the sets cost no memory until a merge actually grows them. When a stats dict is given, time
+    spent in parse_prerequisite_tree and prerequisite strings that yield no tree
+    are accumulated into it (prereq_parse_seconds, prereq_parse_failures).
+    """
     # Hebrew to English key mapping
     hebrew_to_english = {
         'שם מקצוע': 'name',
@@ -156,6 +664,7 @@ def build_course_map(courses, semester_label):
         'בוחן מועד א': 'quiz_a',
     }
     course_map = {}
+    semester_labels = frozenset((semester_label,))
     for course in courses:
         general = course.get('general', {})
         num = general.get('מספר מקצוע')
@@ -166,60 +675,49 @@ def build_course_map(courses, semester_label):
         no_credit_courses_str = general.get('מקצועות ללא זיכוי נוסף')
         contained_no_credit_courses_str = general.get('מקצועות ללא זיכוי נוסף (מוכלים)')
         
-        combined_no_credit_ids = set()
+        # split() never yields empty strings, so the set holds only real IDs (empty if none)
+        combined_no_credit_ids = EMPTY_ID_SET
         if isinstance(no_credit_courses_str, str) and no_credit_courses_str.strip():
-            combined_no_credit_ids.update(no_credit_courses_str.split())
+            combined_no_credit_ids = frozenset(no_credit_courses_str.split())
         if isinstance(contained_no_credit_courses_str, str) and contained_no_credit_courses_str.strip():
-            combined_no_credit_ids.update(contained_no_credit_courses_str.split())
-
-        # Filter out any potential empty strings that might have resulted from split
-        combined_no_credit_ids = {id_ for id_ in combined_no_credit_ids if id_.strip()}
-        final_no_credit_courses_str = " ".join(sorted(list(combined_no_credit_ids))) if combined_no_credit_ids else "" # Store as empty string if no IDs
+            combined_no_credit_ids = combined_no_credit_ids.union(contained_no_credit_courses_str.split())
 
         if num and name:
             if num not in course_map:
-                prereq_tree = parse_prerequisite_tree(prereq_str)
+                if stats is None:
+                    prereq_tree = parse_prerequisite_tree(prereq_str)
+                else:
+                    parse_start = time.perf_counter()
+                    prereq_tree = parse_prerequisite_tree(prereq_str)
+                    stats["prereq_parse_seconds"] = stats.get("prereq_parse_seconds", 0.0) + time.perf_counter() - parse_start
+                    if prereq_str and prereq_tree is None:
+                        stats["prereq_parse_failures"] = stats.get("prereq_parse_failures", 0) + 1
                 english_data = {}
                 for heb_key, eng_key in hebrew_to_english.items():
                     if heb_key in general:
                         # Special handling for no_credit_courses which we've already processed
                         if eng_key == 'no_credit_courses':
-                            english_data[eng_key] = final_no_credit_courses_str
+                            english_data[eng_key] = combined_no_credit_ids
                         else:
                             english_data[eng_key] = general[heb_key]
                 
                 # Ensure no_credit_courses is present even if it was empty initially
                 if 'no_credit_courses' not in english_data:
-                    english_data['no_credit_courses'] = final_no_credit_courses_str
+                    english_data['no_credit_courses'] = combined_no_credit_ids
 
                 course_map[num] = {
                     **english_data,
                     'prereqTree': prereq_tree,
-                    'semesters': [semester_label],
+                    'semesters': semester_labels,
                 }
-            else:
-                # Course already exists, just add semester and merge no_credit_courses
-                if semester_label not in course_map[num]['semesters']:
-                    course_map[num]['semesters'].append(semester_label)
-                
-                # Merge no_credit_courses if the course is re-encountered in a different semester's initial build
-                # This part of the logic might be redundant if merge_course_maps handles it robustly,
-                # but ensures data from the same initial build pass (if courses are listed multiple times) is consistent.
-                existing_ids_set = set()
-                if isinstance(course_map[num].get('no_credit_courses'), str):
-                    existing_ids_set.update(course_map[num]['no_credit_courses'].split())
-                
-                # Add IDs from the current processing pass (which already includes both fields for this course instance)
-                current_pass_ids_set = set()
-                if isinstance(final_no_credit_courses_str, str):
-                     current_pass_ids_set.update(final_no_credit_courses_str.split())
-                
-                combined_set_for_existing_entry = {id_ for id_ in existing_ids_set.union(current_pass_ids_set) if id_.strip()}
-                course_map[num]['no_credit_courses'] = " ".join(sorted(list(combined_set_for_existing_entry))) if combined_set_for_existing_entry else ""
+            elif combined_no_credit_ids:
+                # Course listed more than once in the same semester: keep the first
+                # entry's details and merge in this entry's no_credit_courses
+                course_map[num]['no_credit_courses'] |= combined_no_credit_ids
     return course_map
 
 # Updated merge_course_maps to iteratively merge a new semester's map into a base map
-def merge_course_maps(base_map, incoming_semester_map): # incoming_semester_map is from an OLDER semester than what might be in base_map
+def merge_course_maps(base_map, incoming_semester_map, stats=None): # incoming_semester_map is from an OLDER semester than what might be in base_map
     """
     Merges course data from incoming_semester_map into base_map.
     base_map is populated by processing newer semesters first.
@@ -227,68 +725,453 @@ def merge_course_maps(base_map, incoming_semester_map): # incoming_semester_map
     it means this is its most recent offering found so far; its data is added.
     If a course from incoming_semester_map IS in base_map, it means base_map
     already has data from a NEWER semester. In this case, the newer details are kept,
-    and only the semester from incoming_semester_map is added to the list of semesters.
+    and only the semester from incoming_semester_map is added to the set of semesters.
+    Both maps hold the frozenset-valued 'no_credit_courses' and 'semesters' produced
+    by build_course_map, so each collision costs at most two small set unions and
+    nothing is re-sorted.
+    When a stats dict is given, the number of such collisions is added to stats["collisions"].
     """
+    collisions = 0
     for course_num, incoming_course_data in incoming_semester_map.items():
-        # build_course_map ensures incoming_course_data['semesters'] is a list like [semester_label]
-        incoming_semester_label = incoming_course_data['semesters'][0]
-
         if course_num not in base_map:
             # This course hasn't been seen from any newer semester yet.
             # So, this incoming_course_data is the newest version we have for it. Add it directly.
             base_map[course_num] = incoming_course_data
         else:
             # Course is already in base_map, meaning we have its data from a newer semester.
-            # Preserve the existing (newer) course details in base_map[course_num].
-            # Only add the semester from this incoming_course_data (older semester) to its list.
-            
-            # ---> NEW: Merge no_credit_courses from both sources <--- 
-            base_ids_set = set()
-            incoming_ids_set = set()
-            
-            base_no_credit_str = base_map[course_num].get('no_credit_courses')
-            incoming_no_credit_str = incoming_course_data.get('no_credit_courses')
-
-            if isinstance(base_no_credit_str, str) and base_no_credit_str.strip():
-                base_ids_set.update(base_no_credit_str.split())
-            if isinstance(incoming_no_credit_str, str) and incoming_no_credit_str.strip():
-                incoming_ids_set.update(incoming_no_credit_str.split())
-
-            combined_set_for_merge = {id_ for id_ in base_ids_set.union(incoming_ids_set) if id_.strip()}
-            base_map[course_num]['no_credit_courses'] = " ".join(sorted(list(combined_set_for_merge))) if combined_set_for_merge else ""
-            # ---> End of NEW no_credit_courses merge logic <--- 
-
-            # Ensure 'semesters' list exists and is a list in the base_map entry.
-            if 'semesters' not in base_map[course_num] or not isinstance(base_map[course_num]['semesters'], list):
-                # This should ideally not happen if base_map entries are always well-formed.
-                # If it's missing, initialize it before appending.
-                base_map[course_num]['semesters'] = [] 
+            # Preserve the existing (newer) course details in base_map[course_num];
+            # only its no_credit_courses and semesters absorb the older offering.
+            collisions += 1
+            base_course_data = base_map[course_num]
+            if not incoming_course_data['no_credit_courses'] <= base_course_data['no_credit_courses']:
+                base_course_data['no_credit_courses'] |= incoming_course_data['no_credit_courses']
+            if not incoming_course_data['semesters'] <= base_course_data['semesters']:
+                base_course_data['semesters'] |= incoming_course_data['semesters']
+
+    if stats is not None:
+        stats["collisions"] = stats.get("collisions", 0) + collisions
+    return base_map
+
+def finalize_course_map(merged_map):
+    """
+    Converts the frozenset-valued 'no_credit_courses' and 'semesters' of every course
+    to sorted lists, in place, once all semesters have been merged. Semesters
+    sort alphabetically by Hebrew name (e.g., אביב, חורף, קיץ).
+    """
+    for course_data in merged_map.values():
+        course_data['no_credit_courses'] = sorted(course_data['no_credit_courses'])
+        course_data['semesters'] = sorted(course_data['semesters'])
+    return merged_map
+
+def split_course_map(merged_map):
+    """
+    Splits the merged course map into a slim index holding COURSE_INDEX_FIELDS
+    and detail shards keyed by course-id prefix holding all remaining fields.
+    Returns (index, shards) where shards maps prefix -> {course_id: details}.
+    """
+    index = {}
+    shards = {}
+    for course_id, course_data in merged_map.items():
+        index[course_id] = {field: course_data[field] for field in COURSE_INDEX_FIELDS if field in course_data}
+        details = {field: value for field, value in course_data.items()
+                   if field not in COURSE_INDEX_FIELDS and field != "_id"}
+        shards.setdefault(course_id[:COURSE_DETAIL_SHARD_PREFIX_LENGTH], {})[course_id] = details
+    return index, shards
+
+def write_split_course_files(public_data_dir, merged_map):
+    """
+    Writes courses_index.json and course_details/<prefix>.json (both minified).
+    Shards of prefixes that no longer exist are removed when publishing.
+    """
+    with metrics.stage("write_split_course_files") as stage:
+        index, shards = split_course_map(merged_map)
+        course_index_filepath = Path(public_data_dir) / COURSE_INDEX_FILENAME
+        write_minified_json(course_index_filepath, index)
+
+        details_dir = Path(public_data_dir) / COURSE_DETAILS_DIRNAME
+        details_dir.mkdir(parents=True, exist_ok=True)
+        for prefix, shard in shards.items():
+            write_minified_json(details_dir / f"{prefix}.json", shard)
+        stage["items"] = len(shards)
+        stage["bytes"] = course_index_filepath.stat().st_size + sum(
+            (details_dir / f"{prefix}.json").stat().st_size for prefix in shards)
+    print(f"Wrote {Path(public_data_dir) / COURSE_INDEX_FILENAME} and {len(shards)} detail shards to {details_dir}.")
+
+def collect_prereq_course_ids(prereq_tree, course_ids):
+    """Adds every course id mentioned anywhere in prereq_tree to the course_ids set."""
+    if isinstance(prereq_tree, str):
+        course_ids.add(prereq_tree)
+    elif isinstance(prereq_tree, dict):
+        for subtree in prereq_tree.get('and') or prereq_tree.get('or') or []:
+            collect_prereq_course_ids(subtree, course_ids)
+    return course_ids
+
+def build_course_indexes(merged_map):
+    """
+    Builds the lookup tables the planner would otherwise recompute on every plan edit:
+    - equivalents: course id -> sorted ids of the course itself and every course it
+      grants no additional credit for (base, contained and custom no-credit lists
+      already combined). Courses without no-credit courses are omitted; they are
+      only equivalent to themselves.
+    - unlocks: course id -> sorted ids of the courses whose prerequisites mention it.
+    """
+    equivalents = {}
+    unlocks = {}
+    for course_id, course_data in merged_map.items():
+        no_credit_ids = course_data.get('no_credit_courses') or []
+        if no_credit_ids:
+            equivalents[course_id] = sorted({course_id, *no_credit_ids})
+        for prereq_id in collect_prereq_course_ids(course_data.get('prereqTree'), set()):
+            unlocks.setdefault(prereq_id, set()).add(course_id)
+    return {
+        "equivalents": equivalents,
+        "unlocks": {course_id: sorted(unlocked_ids) for course_id, unlocked_ids in sorted(unlocks.items())},
+    }
+
+def write_course_indexes(public_data_dir, merged_map):
+    """
+    Writes course_indexes.json ({"equivalents": ...}, needed at startup) and
+    course_unlocks.json (the unlocks map itself, loaded on demand).
+    """
+    with metrics.stage("write_course_indexes") as stage:
+        course_indexes = build_course_indexes(merged_map)
+        course_indexes_filepath = Path(public_data_dir) / COURSE_INDEXES_FILENAME
+        course_unlocks_filepath = Path(public_data_dir) / COURSE_UNLOCKS_FILENAME
+        write_minified_json(course_indexes_filepath, {"equivalents": course_indexes["equivalents"]})
+        write_minified_json(course_unlocks_filepath, course_indexes["unlocks"])
+        stage["items"] = len(course_indexes["equivalents"]) + len(course_indexes["unlocks"])
+        stage["bytes"] = course_indexes_filepath.stat().st_size + course_unlocks_filepath.stat().st_size
+    print(f"Wrote {course_indexes_filepath} ({len(course_indexes['equivalents'])} equivalence sets) and "
+          f"{course_unlocks_filepath} ({len(course_indexes['unlocks'])} prerequisite courses).")
+
+def write_search_index(public_data_dir, merged_map):
+    with metrics.stage("write_search_index") as stage:
+        search_index = build_search_index(merged_map)
+        search_index_filepath = Path(public_data_dir) / SEARCH_INDEX_FILENAME
+        write_minified_json(search_index_filepath, search_index)
+        stage["items"] = len(search_index["postings"])
+        stage["bytes"] = search_index_filepath.stat().st_size
+    print(f"Wrote {search_index_filepath} ({len(search_index['ids'])} courses, "
+          f"{len(search_index['postings'])} {SEARCH_NGRAM_SIZE}-grams).")
+
+def iter_collecting_schedules(courses, schedules):
+    """
+    Passes courses through unchanged while storing each course's 'schedule' list
+    in schedules, so the timetable is built from the same decoding pass as the
+    course map. If a course is listed more than once, the first listing that has
+    a schedule wins (build_course_map keeps the first listing's other details).
+    """
+    for course in courses:
+        num = course.get('general', {}).get('מספר מקצוע')
+        if num and course.get('schedule'):
+            schedules.setdefault(num, course['schedule'])
+        yield course
+
+def write_semester_timetable(public_data_dir, semester_key, schedules):
+    with metrics.stage("write_timetable", semester_key) as stage:
+        timetable, skipped_entries = build_semester_timetable(semester_key, schedules)
+        timetables_dir = Path(public_data_dir) / TIMETABLES_DIRNAME
+        timetables_dir.mkdir(parents=True, exist_ok=True)
+        timetable_filepath = timetables_dir / f"{semester_key}.json"
+        write_minified_json(timetable_filepath, timetable)
+        stage["items"] = len(timetable["index"])
+        stage["bytes"] = timetable_filepath.stat().st_size
+    metrics.count("schedule_entries_skipped", skipped_entries)
+    if skipped_entries:
+        print(f"Warning: Skipped {skipped_entries} schedule entries of semester {semester_key} with an unknown day or hours.")
+
+def keep_published_timetables(public_data_dir, staging_dir, semester_keys):
+    """
+    Copies the published timetables of semester_keys that were not rebuilt (because
+    the semester failed) into staging_dir, so publishing keeps them. Timetables of
+    semesters no longer listed in last_semesters.json are not staged and get removed.
+    """
+    for semester_key in semester_keys:
+        staged_filepath = Path(staging_dir) / TIMETABLES_DIRNAME / f"{semester_key}.json"
+        published_filepath = resolve_published_path(public_data_dir, staged_filepath.relative_to(staging_dir))
+        if not staged_filepath.exists() and published_filepath and published_filepath.exists():
+            staged_filepath.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(published_filepath, staged_filepath)
+
+@lru_cache(maxsize=None)
+def get_build_fingerprint():
+    """
+    Hashes the source of the code that turns a semester file into the course map
+    and schedules held in the build cache. Editing any of it invalidates the cache;
+    editing the overrides or the output stages does not.
+    """
+    digest = hashlib.sha256(f"{sys.version_info[:2]}:{BUILD_CACHE_PICKLE_PROTOCOL}\n".encode("utf-8"))
+    for function in (iter_json_array, iter_saved_courses, iter_collecting_schedules, tokenize_prerequisites,
+                     parse_prerequisite_tree, _parse_prerequisite_tree_cached.__wrapped__, build_course_map):
+        digest.update(inspect.getsource(function).encode("utf-8"))
+    for pattern in (PREREQ_SEPARATOR_RE, COURSE_ID_RE):
+        digest.update(pattern.pattern.encode("utf-8"))
+    digest.update(repr(sorted(PREREQ_AND_TOKENS)).encode("utf-8"))
+    return digest.hexdigest()
+
+def get_build_cache_filename(cache_dir, semester_key, source_sha256, semester_label):
+    """
+    Cache entry of a semester, named after the content hash of its file, the label
+    stored in its courses' 'semesters' and the build fingerprint.
+    """
+    cache_key = hashlib.sha256(f"{source_sha256}:{semester_label}:{get_build_fingerprint()}".encode("utf-8")).hexdigest()
+    return Path(cache_dir) / f"{semester_key}-{cache_key[:32]}.pickle"
+
+def load_cached_semester(cache_filename):
+    """
+    Returns the (course_map, schedules) pair stored by save_cached_semester, or None
+    on a miss. Only files this script wrote are ever loaded; an unreadable entry
+    counts as a miss and is rebuilt.
+    """
+    try:
+        with open(cache_filename, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable build cache entry {cache_filename}: {e}")
+        return None
+
+def save_cached_semester(cache_filename, course_map, schedules):
+    """
+    Stores a freshly built semester course map (before merging, which rebinds the
+    course fields) and its schedules, replacing older entries of the same semester.
+    """
+    cache_filename = Path(cache_filename)
+    cache_filename.parent.mkdir(parents=True, exist_ok=True)
+    temp_filename = cache_filename.with_name(cache_filename.name + ".part")
+    with open(temp_filename, "wb") as f:
+        pickle.dump((course_map, schedules), f, protocol=BUILD_CACHE_PICKLE_PROTOCOL)
+    os.replace(temp_filename, cache_filename)
+    semester_key = cache_filename.name.split("-", 1)[0]
+    for stale_filename in cache_filename.parent.glob(f"{semester_key}-*.pickle"):
+        if stale_filename != cache_filename:
+            stale_filename.unlink()
+
+def prune_build_cache(cache_dir, semester_keys):
+    """Deletes cache entries of semesters that are no longer listed in last_semesters.json."""
+    for cache_filename in Path(cache_dir).glob("*.pickle"):
+        if cache_filename.name.split("-", 1)[0] not in semester_keys:
+            cache_filename.unlink()
+
+def apply_course_overrides(all_courses_merged_map):
+    """
+    Applies the hand-maintained additions on top of the merged course map:
+    the physics classification courses and custom no_credit_courses exceptions.
+    """
+    # Add/Update special classification courses, ensuring their semester list is empty
+    special_courses_ids = ["01130013", "01130014"]
+    special_courses_data = {
+        "01130013": {
+            "name": "סיווג פיזיקה מכניקה",
+            "isClassificationCourse": True
+        },
+        "01130014": {
+            "name": "סיווג פיזיקה חשמל",
+            "isClassificationCourse": True
+        }
+    }
+
+    for course_id in special_courses_ids:
+        all_courses_merged_map[course_id] = {
+            "_id": course_id,
+            "name": special_courses_data[course_id]["name"],
+            "credits": 0,
+            "prereqTree": None, 
+            "semesters": [], # Explicitly empty for classification courses
+            "syllabus": None, "faculty": None, "study_program": None,
+            "no_credit_courses": None, "lecturer": None, "notes": None,
+            "exam_a": None, "exam_b": None, "quiz_a": None,
+            "isClassificationCourse": special_courses_data[course_id]["isClassificationCourse"]
+        }
+    print(f"Added/Updated {len(special_courses_ids)} special classification courses.")
+
+    # Custom: Add specific no_credit_courses exceptions
+    custom_no_credit_exceptions = {
+        "00340053": ["00340029"] # Course ID: list of no_credit_courses to add
+        # Add more exceptions here if needed in the future, e.g.:
+        # "COURSE_ID_A": ["NO_CREDIT_A1", "NO_CREDIT_A2"],
+    }
+
+    for course_id, no_credit_additions_list in custom_no_credit_exceptions.items():
+        if course_id in all_courses_merged_map:
+            course_data = all_courses_merged_map[course_id]
             
-            if incoming_semester_label not in base_map[course_num]['semesters']:
-                base_map[course_num]['semesters'].append(incoming_semester_label)
+            current_ids_set = set()
+            existing_no_credit_value = course_data.get('no_credit_courses')
+
+            if isinstance(existing_no_credit_value, str):
+                if existing_no_credit_value.strip(): # Check if string is not empty/whitespace
+                    current_ids_set.update(existing_no_credit_value.split())
+            elif isinstance(existing_no_credit_value, list):
+                # Handle cases where it might have become a list (e.g., from previous script versions)
+                for item in existing_no_credit_value:
+                    if isinstance(item, str) and item.strip():
+                        current_ids_set.update(item.split()) 
+            # If it's None or any other type, current_ids_set remains empty, which is fine.
+
+            # Add new IDs from the custom exceptions list
+            for new_id_to_add in no_credit_additions_list:
+                if new_id_to_add.strip(): # Ensure we don't add empty strings
+                    current_ids_set.add(new_id_to_add.strip())
             
-            # Keep the list of semesters sorted for consistency.
-            # Sorting alphabetically by Hebrew name (e.g., אביב, חורף, קיץ)
-            base_map[course_num]['semesters'] = sorted(list(set(base_map[course_num]['semesters'])))
+            # Update the course data with the new sorted list of IDs
+            course_data['no_credit_courses'] = sorted(current_ids_set)
             
-    return base_map
+            print(f"Updated no_credit_courses for {course_id} to: {course_data['no_credit_courses']}")
+        else:
+            print(f"Warning: Course {course_id} for custom no_credit_courses exception not found in merged map.")
 
-def main():
-    last_semesters = get_last_semesters() # Dict: {"YYYYSS": {"start": ..., "end": ...}}
-    print("Fetched last available semester metadata from the server.")
-    
-    public_data_dir = "public/data"
-    public_data_dir = Path(public_data_dir) # Using Path for consistency
+def record_run_state(manifest, semester_keys, failed_semester_keys, complete):
+    """Stores which semesters the current run covers and which of them failed, so a rerun can resume."""
+    manifest["last_run"] = {
+        "semesters": list(semester_keys),
+        "failed": sorted(failed_semester_keys),
+        "complete": complete,
+    }
+
+def get_semesters_to_resume(public_data_dir, semester_keys, manifest):
+    """
+    After an incomplete run over the same semesters, returns the ones a rerun
+    still has to fetch: those that failed and those whose saved file no longer
+    matches its manifest entry. Returns None when the last run completed or
+    covered other semesters, i.e. everything should be fetched.
+    """
+    last_run = manifest.get("last_run")
+    if not last_run or last_run.get("complete") or last_run.get("semesters") != list(semester_keys):
+        return None
+    failed_semester_keys = set(last_run.get("failed", []))
+    semesters_to_fetch = []
+    for semester_key in semester_keys:
+        semester_data_filename = get_semester_data_filename(public_data_dir, semester_key)
+        file_entry = manifest["files"].get(semester_data_filename.name)
+        if (semester_key in failed_semester_keys or not file_entry
+                or compute_file_sha256(semester_data_filename) != file_entry.get("sha256")):
+            semesters_to_fetch.append(semester_key)
+    return semesters_to_fetch
+
+def compute_inputs_signature(public_data_dir, semester_keys, manifest, degrees_filepath):
+    """
+    Hashes everything the generated files are derived from: the content hash of
+    every semester file, the code that builds them (OUTPUT_CODE_FILENAMES; this
+    script also holds the override tables) and degrees_filepath, which is compiled
+    against the merged courses.
+    """
+    digest = hashlib.sha256()
+    for code_filename in OUTPUT_CODE_FILENAMES:
+        digest.update((SCRIPTS_DIR / code_filename).read_bytes())
+    digest.update(f"{DEGREES_FILENAME}:{compute_file_sha256(degrees_filepath)}\n".encode("utf-8"))
+    for semester_key in semester_keys:
+        file_entry = manifest["files"].get(get_semester_data_filename(public_data_dir, semester_key).name, {})
+        digest.update(f"{semester_key}:{file_entry.get('sha256')}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def compute_outputs_signature(public_data_dir):
+    """
+    Hashes the published outputs as they are on disk: data_index.json and every file
+    it lists. Recorded after a complete build, it lets the "up to date" check notice
+    outputs that were deleted, edited or checked out from another revision since.
+    """
+    public_data_dir = Path(public_data_dir)
+    digest = hashlib.sha256()
+    filenames = [DATA_INDEX_FILENAME] + sorted(load_data_index(public_data_dir).values())
+    for filename in filenames:
+        digest.update(f"{filename}:{compute_file_sha256(public_data_dir / filename)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch Technion semester data and rebuild public/data/merged_courses.json.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_FETCH_WORKERS,
+                        help=f"Maximum number of semester files downloaded in parallel (default: {DEFAULT_FETCH_WORKERS}).")
+    parser.add_argument("--force", action="store_true",
+                        help="Fetch every semester and rebuild merged_courses.json even if nothing changed since the "
+                             "last run, instead of resuming an incomplete one.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_READ_TIMEOUT,
+                        help=f"Seconds to wait for each read from the server before retrying (default: {DEFAULT_READ_TIMEOUT}).")
+    parser.add_argument("--retries", type=int, default=DEFAULT_FETCH_ATTEMPTS - 1,
+                        help="Retries per file after timeouts, dropped connections or 5xx/429 answers, with "
+                             f"exponential backoff (default: {DEFAULT_FETCH_ATTEMPTS - 1}).")
+    parser.add_argument("--strict", action="store_true",
+                        help="Exit with an error and leave the published files untouched if any semester failed, "
+                             "instead of publishing a merge of the semesters that succeeded.")
+    parser.add_argument("--source", choices=DATA_SOURCE_KINDS, default="remote",
+                        help="Where to fetch semester data: the SAP info fetcher over HTTP (remote), the files of "
+                             "--source-dir read directly (directory), or --source-dir served by the bundled "
+                             "local_mirror.py HTTP server (mirror). Default: remote.")
+    parser.add_argument("--source-dir", type=Path, default=DEFAULT_PUBLIC_DATA_DIR,
+                        help="Fixture directory for the directory and mirror sources (default: public/data).")
+    parser.add_argument("--base-url",
+                        help="With --source remote, fetch from a mirror at this URL serving last_semesters.json "
+                             "and courses_YYYY_SSS.json side by side.")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_PUBLIC_DATA_DIR,
+                        help="Directory the semester files and generated data are written to (default: public/data).")
+    parser.add_argument("--degrees", type=Path, default=DEFAULT_DEGREES_FILEPATH,
+                        help=f"Degree templates to compile into {COMPILED_DEGREES_DIRNAME}/ "
+                             f"(default: {DEFAULT_DEGREES_FILEPATH}).")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST_PATH,
+                        help="Where ETags, content hashes and the state of the last run are recorded; use a separate "
+                             f"one per --output-dir (default: {DEFAULT_MANIFEST_PATH}).")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_BUILD_CACHE_DIR,
+                        help="Where parsed semester course maps are cached, keyed by the content hash of each semester "
+                             f"file, so rebuilds only redo the merge and overrides (default: {DEFAULT_BUILD_CACHE_DIR}).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Parse every semester file from scratch and leave the build cache untouched.")
+    parser.add_argument("--report", type=Path,
+                        help="Write a JSON report of per-stage timings, byte and item counts and counters to this path.")
+    parser.add_argument("--profile", type=Path,
+                        help="Run the update under cProfile and dump the stats to this path (download worker threads are not profiled).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.enabled = args.report is not None
+    data_source = create_data_source(args.source, args.source_dir, args.base_url)
+    print(f"Fetching semester data from {data_source.description}.")
+    try:
+        if args.profile:
+            profiler = cProfile.Profile()
+            exit_code = profiler.runcall(run_update, args, data_source)
+            profiler.dump_stats(args.profile)
+            print(f"Wrote cProfile stats to {args.profile}")
+        else:
+            exit_code = run_update(args, data_source)
+    finally:
+        data_source.close()
+        if args.report:
+            metrics.write_report(args.report)
+    return exit_code
+
+def run_update(args, data_source):
+    """Runs one refresh. Returns the process exit code: 1 if --strict refused to publish, else 0."""
+    session = create_http_session(args.workers, data_source)
+    timeout = (DEFAULT_CONNECT_TIMEOUT, args.timeout)
+    attempts = args.retries + 1
+
+    public_data_dir = Path(args.output_dir)
     public_data_dir.mkdir(parents=True, exist_ok=True) # Ensures directory exists
-    
+    manifest = load_manifest(args.manifest, public_data_dir)
+
     last_semesters_filepath = public_data_dir / "last_semesters.json"
-    with open(last_semesters_filepath, "w", encoding="utf-8") as f:
-        json.dump(last_semesters, f, ensure_ascii=False, indent=4)
-    print(f"Updated {last_semesters_filepath}")
+    try:
+        last_semesters, last_semesters_entry, last_semesters_changed = get_last_semesters(
+            session, last_semesters_filepath, manifest["files"].get(last_semesters_filepath.name), data_source, timeout, attempts
+        ) # Dict: {"YYYYSS": {"start": ..., "end": ...}}
+    except (requests.exceptions.RequestException, TransientHTTPError) as e:
+        print(f"Error: Could not fetch the list of available semesters: {e}. Nothing was updated.")
+        return 1
+    # Every generated file is written to staging_dir and published together at the end
+    staging_dir = create_staging_dir(public_data_dir)
+    write_minified_json(staging_dir / last_semesters_filepath.name, last_semesters)
+    if last_semesters_changed:
+        print("Fetched last available semester metadata from the server.")
+    else:
+        print(f"Last available semester metadata not modified since last run ({last_semesters_filepath}).")
     
     all_courses_merged_map = {}
     semesters_processed_count = 0
     semesters_failed_count = 0
+    failed_semester_keys = []
+    build_cache_hits = 0
 
     # Sort semester keys to process them chronologically (e.g., "202201", "202202", "202301")
     # This ensures that course data is taken from the earliest available semester.
@@ -297,117 +1180,179 @@ def main():
 
     print(f"Found {len(sorted_semester_keys)} semesters to process (newest first).")
 
+    # Download all semesters in parallel; merging below still happens newest first,
+    # which merge_course_maps relies on to keep the most recent course details.
+    # Semesters fetched successfully by an incomplete previous run are not requested again
+    semesters_to_fetch = None if args.force else get_semesters_to_resume(public_data_dir, sorted_semester_keys, manifest)
+    if semesters_to_fetch is None:
+        semesters_to_fetch = sorted_semester_keys
+    else:
+        print(f"Resuming the incomplete previous run: {len(semesters_to_fetch)} of {len(sorted_semester_keys)} "
+              f"semesters still need fetching ({', '.join(semesters_to_fetch) or 'none'}).")
+    print(f"Fetching {len(semesters_to_fetch)} semesters with up to {args.workers} parallel downloads...")
+    fetched_semesters, fetch_errors = fetch_all_semesters(semesters_to_fetch, public_data_dir, session, args.workers, manifest,
+                                                          data_source, timeout, attempts)
+    for semester_key, (_, file_entry) in fetched_semesters.items():
+        manifest["files"][get_semester_data_filename(public_data_dir, semester_key).name] = file_entry
+    # Saved before merging so that even a crash below leaves a resumable state
+    record_run_state(manifest, sorted_semester_keys, fetch_errors, complete=False)
+    save_manifest(args.manifest, manifest)
+
+    merged_courses_filepath = public_data_dir / "merged_courses.json"
+    inputs_signature = compute_inputs_signature(public_data_dir, sorted_semester_keys, manifest, args.degrees)
+    merged_courses_entry = manifest["merged_courses"]
+    is_up_to_date = (not args.force and not fetch_errors
+                     and merged_courses_entry.get("inputs_sha256") == inputs_signature)
+    if is_up_to_date and (compute_file_sha256(merged_courses_filepath) != merged_courses_entry.get("sha256")
+                          or compute_outputs_signature(public_data_dir) != merged_courses_entry.get("outputs_sha256")):
+        print(f"The published files in {public_data_dir} differ from the last build; rebuilding them.")
+        is_up_to_date = False
+    if is_up_to_date:
+        # Only last_semesters.json was staged; it is replaced if its dates changed
+        compress_staged_files(staging_dir)
+        publish_staged_files(staging_dir, public_data_dir)
+        manifest["files"][last_semesters_filepath.name] = last_semesters_entry
+        record_run_state(manifest, sorted_semester_keys, [], complete=True)
+        save_manifest(args.manifest, manifest)
+        print(f"No semester data changed since the last run. {merged_courses_filepath} is up to date.")
+        return 0
+
     for semester_key in sorted_semester_keys: # semester_key is "YYYYSS"
         print(f"Processing semester: {semester_key}...")
         
         try:
-            # map_semester_code is used by fetch_and_save_courses internally
-            # Construct filename for individual semester data
-            year_for_fn, sem_code_for_fn = map_semester_code(semester_key)
-            semester_data_filename = public_data_dir / f"courses_{year_for_fn}_{sem_code_for_fn}.json"
+            if semester_key in fetch_errors:
+                raise fetch_errors[semester_key]
 
-            current_semester_courses_data = fetch_and_save_courses(semester_key, semester_data_filename)
-            print(f"Fetched and saved courses for semester {semester_key} to {semester_data_filename}")
+            year_for_fn, _ = map_semester_code(semester_key)
+            semester_data_filename = get_semester_data_filename(public_data_dir, semester_key)
 
             semester_code_suffix = semester_key[4:] # e.g., '01', '02', '03'
             semester_label = get_semester_label(semester_code_suffix) # e.g., 'חורף', 'אביב', 'קיץ'
             
-            current_semester_course_map = build_course_map(current_semester_courses_data, semester_label)
-            all_courses_merged_map = merge_course_maps(all_courses_merged_map, current_semester_course_map)
+            with metrics.stage("build_course_map", semester_key) as build_stage:
+                cache_filename = cached_semester = None
+                if not args.no_cache:
+                    cache_filename = get_build_cache_filename(args.cache_dir, semester_key,
+                                                              compute_file_sha256(semester_data_filename), semester_label)
+                    cached_semester = load_cached_semester(cache_filename)
+                if cached_semester is not None:
+                    current_semester_course_map, semester_schedules = cached_semester
+                    build_stage["cache"] = "hit"
+                else:
+                    # Courses are decoded one at a time from the saved file, so only one
+                    # semester's course map is held in memory alongside the merged map.
+                    semester_schedules = {}
+                    current_semester_courses = iter_collecting_schedules(iter_saved_courses(semester_data_filename),
+                                                                         semester_schedules)
+                    if metrics.enabled:
+                        current_semester_courses = timed_iter(current_semester_courses, build_stage, "json_decode_seconds")
+                        build_stage["bytes"] = semester_data_filename.stat().st_size
+                    current_semester_course_map = build_course_map(current_semester_courses, semester_label,
+                                                                   build_stage if metrics.enabled else None)
+                    if cache_filename:
+                        save_cached_semester(cache_filename, current_semester_course_map, semester_schedules)
+                        build_stage["cache"] = "miss"
+                build_stage["items"] = len(current_semester_course_map)
+            if cached_semester is not None:
+                build_cache_hits += 1
+            metrics.count("build_cache_hits" if cached_semester is not None else "build_cache_misses")
+            with metrics.stage("merge_course_maps", semester_key) as merge_stage:
+                all_courses_merged_map = merge_course_maps(all_courses_merged_map, current_semester_course_map,
+                                                           merge_stage if metrics.enabled else None)
+                merge_stage["items"] = len(current_semester_course_map)
+            metrics.count("courses_parsed", build_stage["items"])
+            metrics.count("prereq_parse_failures", build_stage.get("prereq_parse_failures", 0))
+            metrics.count("merge_collisions", merge_stage.get("collisions", 0))
+            write_semester_timetable(staging_dir, semester_key, semester_schedules)
             semesters_processed_count += 1
             print(f"Successfully processed and merged data for semester {semester_key} ({semester_label} {year_for_fn}).")
 
         except RuntimeError as e: # From fetch_and_save_courses if HTTP error
             print(f"Warning: Could not fetch data for semester {semester_key}. {e}. Skipping.")
             semesters_failed_count += 1
+            failed_semester_keys.append(semester_key)
         except ValueError as e: # From map_semester_code or get_semester_label if unknown semester type
             print(f"Warning: Invalid semester code for {semester_key}. {e}. Skipping.")
             semesters_failed_count += 1
+            failed_semester_keys.append(semester_key)
         except Exception as e:
             print(f"Error processing semester {semester_key}: {e}. Skipping.")
             semesters_failed_count += 1
+            failed_semester_keys.append(semester_key)
             
     print(f"Finished processing all semesters. Processed: {semesters_processed_count}, Failed/Skipped: {semesters_failed_count}.")
+    cache_info = prereq_parse_cache_info()
+    print(f"Prerequisite parse cache: {cache_info.hits} hits, {cache_info.misses} misses.")
+    if not args.no_cache:
+        print(f"Build cache: {build_cache_hits} of {semesters_processed_count} semesters loaded from {args.cache_dir}.")
 
-    if semesters_processed_count > 0 and all_courses_merged_map:
-        # Add/Update special classification courses, ensuring their semester list is empty
-        special_courses_ids = ["01130013", "01130014"]
-        special_courses_data = {
-            "01130013": {
-                "name": "סיווג פיזיקה מכניקה",
-                "isClassificationCourse": True
-            },
-            "01130014": {
-                "name": "סיווג פיזיקה חשמל",
-                "isClassificationCourse": True
-            }
-        }
+    if failed_semester_keys and args.strict:
+        discard_staging_dir(staging_dir)
+        record_run_state(manifest, sorted_semester_keys, failed_semester_keys, complete=False)
+        save_manifest(args.manifest, manifest)
+        print(f"Error: {semesters_failed_count} of {len(sorted_semester_keys)} semesters failed "
+              f"({', '.join(failed_semester_keys)}). --strict: {merged_courses_filepath} was not updated. "
+              "Rerun to fetch only the failed semesters.")
+        return 1
 
-        for course_id in special_courses_ids:
-            all_courses_merged_map[course_id] = {
-                "_id": course_id,
-                "name": special_courses_data[course_id]["name"],
-                "credits": 0,
-                "prereqTree": None, 
-                "semesters": [], # Explicitly empty for classification courses
-                "syllabus": None, "faculty": None, "study_program": None,
-                "no_credit_courses": None, "lecturer": None, "notes": None,
-                "exam_a": None, "exam_b": None, "quiz_a": None,
-                "isClassificationCourse": special_courses_data[course_id]["isClassificationCourse"]
-            }
-        print(f"Added/Updated {len(special_courses_ids)} special classification courses.")
-
-        # Custom: Add specific no_credit_courses exceptions
-        custom_no_credit_exceptions = {
-            "00340053": ["00340029"] # Course ID: list of no_credit_courses to add
-            # Add more exceptions here if needed in the future, e.g.:
-            # "COURSE_ID_A": ["NO_CREDIT_A1", "NO_CREDIT_A2"],
-        }
+    if semesters_processed_count > 0 and all_courses_merged_map:
+        with metrics.stage("finalize_course_map") as stage:
+            finalize_course_map(all_courses_merged_map)
+            stage["items"] = len(all_courses_merged_map)
+        with metrics.stage("apply_course_overrides") as stage:
+            apply_course_overrides(all_courses_merged_map)
+            stage["items"] = len(all_courses_merged_map)
+        for course_data in all_courses_merged_map.values():
+            if course_data.get('no_credit_courses'):
+                metrics.observe("no_credit_set_size", len(course_data['no_credit_courses']))
 
-        for course_id, no_credit_additions_list in custom_no_credit_exceptions.items():
-            if course_id in all_courses_merged_map:
-                course_data = all_courses_merged_map[course_id]
-                
-                current_ids_set = set()
-                existing_no_credit_value = course_data.get('no_credit_courses')
-
-                if isinstance(existing_no_credit_value, str):
-                    if existing_no_credit_value.strip(): # Check if string is not empty/whitespace
-                        current_ids_set.update(existing_no_credit_value.split())
-                elif isinstance(existing_no_credit_value, list):
-                    # Handle cases where it might have become a list (e.g., from previous script versions)
-                    for item in existing_no_credit_value:
-                        if isinstance(item, str) and item.strip():
-                            current_ids_set.update(item.split()) 
-                # If it's None or any other type, current_ids_set remains empty, which is fine.
-
-                # Add new IDs from the custom exceptions list
-                for new_id_to_add in no_credit_additions_list:
-                    if new_id_to_add.strip(): # Ensure we don't add empty strings
-                        current_ids_set.add(new_id_to_add.strip())
-                
-                # Update the course data with the new space-separated string
-                if current_ids_set: # If there are any IDs in the set
-                    course_data['no_credit_courses'] = " ".join(sorted(list(current_ids_set)))
-                else:
-                    # If set is empty, store an empty string or None, based on preference.
-                    # Storing empty string for consistency if the field is expected to be a string.
-                    course_data['no_credit_courses'] = ""
-                
-                print(f"Updated no_credit_courses for {course_id} to: \"{course_data['no_credit_courses']}\"")
-            else:
-                print(f"Warning: Course {course_id} for custom no_credit_courses exception not found in merged map.")
-        
-        merged_courses_filepath = public_data_dir / "merged_courses.json"
-        with open(merged_courses_filepath, "w", encoding="utf-8") as f:
-            json.dump(all_courses_merged_map, f, ensure_ascii=False, indent=4)
-        print(f"Successfully created/updated {merged_courses_filepath} with data from {semesters_processed_count} semesters.")
+        with metrics.stage("write_merged_courses") as stage:
+            write_minified_json(staging_dir / merged_courses_filepath.name, all_courses_merged_map)
+            stage["items"] = len(all_courses_merged_map)
+            stage["bytes"] = (staging_dir / merged_courses_filepath.name).stat().st_size
+        print(f"Built {merged_courses_filepath.name} with data from {semesters_processed_count} semesters.")
+        write_split_course_files(staging_dir, all_courses_merged_map)
+        write_course_indexes(staging_dir, all_courses_merged_map)
+        write_search_index(staging_dir, all_courses_merged_map)
+        with metrics.stage("compile_degrees") as stage:
+            degree_problems = write_compiled_degrees(staging_dir, all_courses_merged_map, args.degrees)
+            if degree_problems:
+                metrics.count("degree_rule_errors", degree_problems[0])
+                metrics.count("degree_unknown_courses", degree_problems[1])
+        keep_published_timetables(public_data_dir, staging_dir, failed_semester_keys)
+        if not args.no_cache:
+            prune_build_cache(args.cache_dir, sorted_semester_keys)
+        # Complete outputs: files in these directories that were not rebuilt are stale
+        generated_subdirs, generated_filenames = GENERATED_SUBDIRS, GENERATED_FILENAMES
     elif not all_courses_merged_map and semesters_processed_count > 0 :
         print("Warning: Processed some semesters, but the final merged map is empty. merged_courses.json will not be updated.")
+        generated_subdirs = generated_filenames = ()
     else: # semesters_processed_count == 0
         print("No semester data could be successfully processed. merged_courses.json was not created or updated.")
+        generated_subdirs = generated_filenames = ()
+
+    with metrics.stage("publish") as stage:
+        stage["compressed"] = compress_staged_files(staging_dir)
+        replaced, unchanged, removed = publish_staged_files(staging_dir, public_data_dir, generated_subdirs,
+                                                             generated_filenames)
+        stage["items"] = replaced + unchanged
+    print(f"Published to {public_data_dir}: {replaced} files replaced, {unchanged} unchanged, {removed} removed.")
+    manifest["files"][last_semesters_filepath.name] = last_semesters_entry
+    if generated_subdirs and semesters_failed_count == 0:
+        # Only a complete build may be skipped next time; a partial one must be redone
+        manifest["merged_courses"] = {
+            "inputs_sha256": inputs_signature,
+            "sha256": compute_file_sha256(merged_courses_filepath),
+            "outputs_sha256": compute_outputs_signature(public_data_dir),
+        }
+    # Written last, so a run interrupted while publishing is not mistaken for a complete one
+    record_run_state(manifest, sorted_semester_keys, failed_semester_keys, complete=not failed_semester_keys)
+    save_manifest(args.manifest, manifest)
+    if failed_semester_keys:
+        print(f"Warning: the published data is missing {semesters_failed_count} of {len(sorted_semester_keys)} semesters "
+              f"({', '.join(failed_semester_keys)}). Rerun to fetch only those, or use --strict to refuse partial merges.")
+    return 0
 
 if __name__ == "__main__":
-    # Need to import Path here if used in main
-    from pathlib import Path
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
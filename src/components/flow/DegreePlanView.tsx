@@ -24,10 +24,11 @@ import AddSemesterNode from './customNodes/AddSemesterNode';
 import SemesterTitleNode from './customNodes/SemesterTitleNode';
 import EditCoursesNode from './customNodes/EditCoursesNode';
 import { CourseSelectionModal } from '../../components/ui/CourseSelectionModal';
-import { fetchAllCourses, fetchDegreeTemplates } from '../../utils/dataLoader';
-import { DegreeTemplate, RawCourseData, DegreeRule, PrerequisiteItem, PrerequisiteGroup } from '../../types/data';
+import { fetchAllCourses, fetchCompiledDegree, fetchCourseIndexes, fetchDegreeTemplates } from '../../utils/dataLoader';
+import { DegreeTemplate, RawCourseData, DegreeRule, PrerequisiteItem, PrerequisiteGroup, CourseIndexes, CompiledDegree } from '../../types/data';
 import { CourseNodeData, RuleNodeData } from '../../types/flow';
-import { evaluateRule } from '../../utils/ruleEvaluator';
+import { evaluateRule, getExemptionCredits, isCourseDone } from '../../utils/ruleEvaluator';
+import { evaluateCompiledRule, isCompiledDegreeCurrent, isRuleCompiled, sumCompiledTargets } from '../../utils/compiledDegree';
 import { AveragesDisplay } from '../../components/ui/AveragesDisplay';
 import { savePlan, loadPlan, StoredPlan } from '../../utils/planStorage';
 import { useTheme } from '../../hooks/useTheme';
@@ -89,6 +90,7 @@ const initialClassificationCheckedState: Record<string, boolean> = {};
 const transformDataToNodes = (
   template: DegreeTemplate | undefined,
   allCourses: RawCourseData[],
+  courseIndexes: CourseIndexes | undefined,
   currentGrades: Record<string, string>,
   currentBinaryStates: Record<string, boolean>,
   handleBinaryChange: (courseId: string, isBinary: boolean) => void,
@@ -102,6 +104,7 @@ const transformDataToNodes = (
   onClassificationCreditsChangeCallback: (courseId: string, credits: number) => void,
   globalRules: DegreeRule[],
   allTemplatesData: Record<string, DegreeTemplate> | null,
+  compiledDegree: CompiledDegree | undefined,
   onEditRuleCallback?: (ruleId: string) => void,
   onDeleteRuleCallback?: (ruleId: string) => void,
   onSyncRulesCallback?: (ruleId: string) => void,
@@ -431,8 +434,26 @@ const transformDataToNodes = (
     return calculateRulePosition(defaultOrder);
   };
 
-  otherRules.forEach((rule) => {
-    const ruleStatus = evaluateRule(
+  // Rules left as they are in degrees.json are read from the compiled plan's sums,
+  // computed once for the whole plan; edited rules, lists or mandatory courses use evaluateRule
+  const pristineTemplate = allTemplatesData?.[template.id];
+  const compiledProgress = isCompiledDegreeCurrent(compiledDegree, template, pristineTemplate)
+    ? sumCompiledTargets(
+        compiledDegree,
+        coursesInCurrentPlan,
+        courseId => isCourseDone(courseId, currentGrades, currentBinaryStates),
+        getExemptionCredits(classificationCheckedState, classificationCreditsState)
+      )
+    : undefined;
+  const evaluateTemplateRule = (rule: DegreeRule) => {
+    if (compiledProgress && compiledDegree && pristineTemplate && template["courses-lists"]
+        && isRuleCompiled(rule, compiledDegree, pristineTemplate)) {
+      const compiledStatus = evaluateCompiledRule(rule, compiledDegree, compiledProgress, template["courses-lists"]);
+      if (compiledStatus) {
+        return compiledStatus;
+      }
+    }
+    return evaluateRule(
       rule, coursesInCurrentPlan, currentGrades, 
       currentBinaryStates,
       template["courses-lists"], 
@@ -440,6 +461,10 @@ const transformDataToNodes = (
       classificationCheckedState, 
       classificationCreditsState
     );
+  };
+
+  otherRules.forEach((rule) => {
+    const ruleStatus = evaluateTemplateRule(rule);
     const nodeId = `rule-${rule.id}`;
     
     let estimatedHeight = 120; 
@@ -504,14 +529,7 @@ const transformDataToNodes = (
       let allConsolidatedSatisfied = true;
 
       rulesToConsolidate.forEach(rule => {
-        const ruleStatus = evaluateRule(
-          rule, coursesInCurrentPlan, currentGrades, 
-          currentBinaryStates,
-          template["courses-lists"], 
-          effectiveMandatoryCourseIds,
-          classificationCheckedState, 
-          classificationCreditsState
-        );
+        const ruleStatus = evaluateTemplateRule(rule);
         consolidatedRuleDetails.push({
           id: rule.id,
           description: rule.description || `חוק ${rule.type}`,
@@ -614,7 +632,8 @@ const transformDataToNodes = (
         semesterNumberForLayout, 
         template.semesters, 
         allCourses,
-        classificationCheckedState
+        classificationCheckedState,
+        courseIndexes
       );
 
       if (import.meta.env.DEV) {
@@ -752,6 +771,8 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
   const [grades, setGrades] = useState<Record<string, string>>({});
   const [binaryStates, setBinaryStates] = useState<Record<string, boolean>>({});
   const [allCoursesData, setAllCoursesData] = useState<RawCourseData[]>([]);
+  const [courseIndexes, setCourseIndexes] = useState<CourseIndexes | undefined>(undefined);
+  const [compiledDegree, setCompiledDegree] = useState<CompiledDegree | undefined>(undefined);
   const [degreeTemplate, setDegreeTemplate] = useState<DegreeTemplate | undefined>(undefined);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [semesterToAddCourseTo, setSemesterToAddCourseTo] = useState<number | null>(null);
@@ -1397,6 +1418,24 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
     };
   }, [degreeTemplate, grades, classificationChecked, classificationCredits, binaryStates, currentUser, authLoading, setSaveStatus, isLoading, isInitialLoad, hasUserMadeChanges]);
 
+  // Load the compiled plan of the selected degree; rule evaluation falls back to evaluateRule without it
+  const degreeTemplateId = degreeTemplate?.id;
+  useEffect(() => {
+    setCompiledDegree(undefined);
+    if (!degreeTemplateId) {
+      return;
+    }
+    let isCurrent = true;
+    fetchCompiledDegree(degreeTemplateId).then(compiled => {
+      if (isCurrent) {
+        setCompiledDegree(compiled);
+      }
+    });
+    return () => {
+      isCurrent = false;
+    };
+  }, [degreeTemplateId]);
+
   useEffect(() => {
     const loadInitialData = async () => {
       if (import.meta.env.DEV) {
@@ -1414,11 +1453,12 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
       setIsLoading(true);
   
       try {
-        const courses = await fetchAllCourses();
+        const [courses, indexes] = await Promise.all([fetchAllCourses(), fetchCourseIndexes()]);
         if (import.meta.env.DEV) {
           console.log("[DegreePlanView] Initial Load: Fetched allCourses:", courses.length);
         }
         setAllCoursesData(courses);
+        setCourseIndexes(indexes);
   
         const fetchedDegreeFileData = await fetchDegreeTemplates();
         if (import.meta.env.DEV) {
@@ -1757,6 +1797,7 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
     const newNodes = transformDataToNodes(
       degreeTemplate,
       allCoursesData,
+      courseIndexes,
       grades, 
       binaryStates,
       handleBinaryChange, 
@@ -1770,6 +1811,7 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
       handleClassificationCreditsChange,
       currentGlobalRules,
       allTemplatesData,
+      compiledDegree,
       handleEditRule,
       handleDeleteRule,
       handleSyncRules,
@@ -1784,12 +1826,12 @@ function DegreePlanView({ allTemplatesData }: DegreePlanViewProps) {
     setNodes(() => newNodes);
     setEdges(() => newEdges);
   }, [
-    degreeTemplate, allCoursesData, grades, binaryStates, classificationChecked, 
+    degreeTemplate, allCoursesData, courseIndexes, grades, binaryStates, classificationChecked, 
     classificationCredits, currentGlobalRules,
     handleAddCourseToSemesterCallback, handleAddSemesterCallback, handleGradeChange, 
     handleRemoveCourseCallback, handleBinaryChange, handleClassificationToggle, 
     handleClassificationCreditsChange, handleEditRule, handleDeleteRule, handleSyncRules, handleToggleCourseListEditorModal,
-    handleRemoveSemesterCallback, setNodes, setEdges, isLoading, allTemplatesData
+    handleRemoveSemesterCallback, setNodes, setEdges, isLoading, allTemplatesData, compiledDegree
   ]);
 
   const handleSelectionChange = useCallback(({ nodes: selNodes }: OnSelectionChangeParams) => {
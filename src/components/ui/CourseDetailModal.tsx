@@ -1,6 +1,7 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import BaseModal from './BaseModal';
-import { RawCourseData, PrerequisiteGroup } from '../../types/data';
+import { RawCourseData, PrerequisiteGroup, CourseDetails } from '../../types/data';
+import { fetchCourseDetails, fetchCourseUnlocks } from '../../utils/dataLoader';
 import PrereqCourseIdWithTooltip from './PrereqCourseIdWithTooltip';
 import PrereqTreeDisplay, { HandledPrereq } from './PrereqTreeDisplay';
 
@@ -15,6 +16,33 @@ interface CourseDetailModalProps {
 }
 
 export const CourseDetailModal: React.FC<CourseDetailModalProps> = ({ isOpen, onClose, course, allCourses, coursesInPlanIds, semesters, targetCourseSemesterKey }) => {
+  // Syllabus, lecturer, exams etc. are not part of the course index; load them when the modal opens
+  const [courseDetails, setCourseDetails] = useState<CourseDetails | null>(null);
+  const [unlockedCourseIds, setUnlockedCourseIds] = useState<string[]>([]);
+  const courseIdToLoad = isOpen ? course?._id : undefined;
+
+  useEffect(() => {
+    setCourseDetails(null);
+    setUnlockedCourseIds([]);
+    if (!courseIdToLoad) {
+      return;
+    }
+    let cancelled = false;
+    fetchCourseDetails(courseIdToLoad).then(details => {
+      if (!cancelled && details) {
+        setCourseDetails(details);
+      }
+    });
+    fetchCourseUnlocks(courseIdToLoad).then(courseIds => {
+      if (!cancelled) {
+        setUnlockedCourseIds(courseIds);
+      }
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [courseIdToLoad]);
+
   if (!isOpen || !course) {
     return null;
   }
@@ -24,18 +52,18 @@ export const CourseDetailModal: React.FC<CourseDetailModalProps> = ({ isOpen, on
   const courseCredits = course.credits !== undefined ? course.credits : 'N/A';
   const academicPoints = course.academic_points;
   const hours = course.hours;
-  const faculty = course.faculty;
+  const faculty = courseDetails?.faculty ?? course.faculty;
   const semestersFromInfo = course.semester;
   const descriptionFromInfo = course.info;
   const prerequisitesText = course.prerequisites as string | undefined;
   const courseUrl = course.url;
-  const syllabus = course.syllabus;
-  const studyProgram = course.study_program;
+  const syllabus = courseDetails?.syllabus ?? course.syllabus;
+  const studyProgram = courseDetails?.study_program ?? course.study_program;
   const noCreditCourses = course.no_credit_courses;
-  const lecturer = course.lecturer;
-  const notes = course.notes;
-  const examADate = course.exam_a;
-  const examBDate = course.exam_b;
+  const lecturer = courseDetails?.lecturer ?? course.lecturer;
+  const notes = courseDetails?.notes ?? course.notes;
+  const examADate = courseDetails?.exam_a ?? course.exam_a;
+  const examBDate = courseDetails?.exam_b ?? course.exam_b;
   const prereqTreeData = course.prereqTree;
 
   const isValidPrereqTree = (data: unknown): data is HandledPrereq => {
@@ -111,6 +139,21 @@ export const CourseDetailModal: React.FC<CourseDetailModalProps> = ({ isOpen, on
 
         {renderPrereqSection()}
 
+        {unlockedCourseIds.length > 0 && (
+          <div>
+            <strong className="font-medium text-gray-800 dark:text-gray-100">מקצוע קדם עבור:</strong>
+            <div className="mt-1 flex flex-wrap gap-1">
+              {unlockedCourseIds.map(unlockedCourseId => (
+                <PrereqCourseIdWithTooltip
+                  key={unlockedCourseId}
+                  courseId={unlockedCourseId}
+                  allCourses={allCourses}
+                />
+              ))}
+            </div>
+          </div>
+        )}
+
         {syllabus && (
           <div>
             <strong className="font-medium text-gray-800 dark:text-gray-100">סילבוס:</strong>
@@ -120,11 +163,11 @@ export const CourseDetailModal: React.FC<CourseDetailModalProps> = ({ isOpen, on
 
         {studyProgram && <p><strong className="font-medium text-gray-800 dark:text-gray-100">תוכנית לימודים:</strong> {studyProgram}</p>}
         
-        {noCreditCourses && (
+        {noCreditCourses && noCreditCourses.length > 0 && (
           <div>
             <strong className="font-medium text-gray-800 dark:text-gray-100">קורסים ללא זיכוי נוסף:</strong>
             <div className="mt-1 flex flex-wrap gap-1">
-              {noCreditCourses.split(/[,\s]+/).map(id => id.trim()).filter(id => id).map((courseId, index) => (
+              {noCreditCourses.map((courseId, index) => (
                 <PrereqCourseIdWithTooltip 
                   key={index} 
                   courseId={courseId} 
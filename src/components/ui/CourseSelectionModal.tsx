@@ -1,5 +1,7 @@
-import React, { useState, useMemo } from 'react';
-import { RawCourseData } from '../../types/data';
+import React, { useState, useMemo, useEffect } from 'react';
+import { CourseSearchIndex, RawCourseData } from '../../types/data';
+import { fetchCourseSearchIndex } from '../../utils/dataLoader';
+import { searchCourseIds } from '../../utils/courseSearch';
 import BaseModal from './BaseModal';
 
 interface CourseSelectionModalProps {
@@ -22,6 +24,13 @@ export const CourseSelectionModal: React.FC<CourseSelectionModalProps> = ({
   alreadyTakenCourses = [], // Default to empty array
 }) => {
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchIndex, setSearchIndex] = useState<CourseSearchIndex | undefined>(undefined);
+
+  useEffect(() => {
+    if (isOpen && !searchIndex) {
+      fetchCourseSearchIndex().then(setSearchIndex);
+    }
+  }, [isOpen, searchIndex]);
 
   // Combine available and already taken courses for display
   const allCoursesForDisplay = useMemo(() => {
@@ -34,11 +43,16 @@ export const CourseSelectionModal: React.FC<CourseSelectionModalProps> = ({
     if (!searchTerm) {
       return allCoursesForDisplay;
     }
+    // Look the term up in the prebuilt index; scan the list only until it has loaded
+    const matchingIds = searchIndex ? searchCourseIds(searchIndex, searchTerm) : null;
+    if (matchingIds) {
+      return allCoursesForDisplay.filter(course => matchingIds.has(course._id));
+    }
     return allCoursesForDisplay.filter(course => 
       course.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
       course._id.toLowerCase().includes(searchTerm.toLowerCase())
     );
-  }, [allCoursesForDisplay, searchTerm]);
+  }, [allCoursesForDisplay, searchTerm, searchIndex]);
 
   const modalTitle = customTitle 
     ? customTitle 
@@ -56,7 +70,7 @@ export const CourseSelectionModal: React.FC<CourseSelectionModalProps> = ({
       <div className="mb-4">
         <input 
           type="text"
-          placeholder="חפש לפי שם או מספר קורס..."
+          placeholder="חפש לפי שם, מספר קורס או מרצה..."
           className="w-full p-2 border border-gray-300 dark:border-gray-600 rounded-md dark:bg-gray-700 dark:text-gray-200 focus:ring-1 focus:ring-blue-500 outline-none"
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
@@ -1,6 +1,6 @@
 // Types for data loaded from public/data/*.json
 
-// Represents a single course from merged_courses.json
+// Represents a single course from courses_index.json (detail fields are loaded separately, see CourseDetails)
 export interface RawCourseData {
   _id: string; // Course ID, e.g., "123456"
   name: string; // Course name in Hebrew
@@ -16,7 +16,7 @@ export interface RawCourseData {
   url?: string;
   syllabus?: string;
   study_program?: string;
-  no_credit_courses?: string;
+  no_credit_courses?: string[] | null;
   lecturer?: string;
   notes?: string;
   exam_a?: string;
@@ -26,6 +26,87 @@ export interface RawCourseData {
   [key: string]: unknown; // Changed to unknown
 }
 
+// Fields of a course that are not part of courses_index.json and are loaded
+// on demand from data/course_details/<id prefix>.json
+export type CourseDetails = Pick<RawCourseData, 'syllabus' | 'faculty' | 'study_program' | 'lecturer' | 'notes' | 'exam_a' | 'exam_b'> & {
+  quiz_a?: string;
+};
+
+// Contents of course_indexes.json, precomputed by scripts/update_semesters.py
+export interface CourseIndexesFileStructure {
+  equivalents: Record<string, string[]>; // Course ID -> itself and the courses it grants no additional credit for
+}
+
+// course_indexes.json converted to lookup structures once at load time
+export interface CourseIndexes {
+  equivalents: Map<string, Set<string>>;
+}
+
+// Contents of course_unlocks.json: course ID -> courses whose prerequisites mention it
+export type CourseUnlocksFileStructure = Record<string, string[]>;
+
+// Contents of search_index.json, built by scripts/search_index.py
+export interface SearchIndexFileStructure {
+  ngram_size: number;
+  ids: string[]; // Sorted course IDs; a course's ordinal is its position here
+  texts: string[]; // Normalized name and lecturer of each course, by ordinal
+  postings: Record<string, number[]>; // N-gram -> sorted ordinals of the courses containing it, delta-encoded
+}
+
+// search_index.json with its posting lists decoded once at load time
+export interface CourseSearchIndex {
+  ngramSize: number;
+  ids: string[];
+  texts: string[];
+  postings: Map<string, Int32Array>;
+}
+
+// Contents of data_index.json, written by scripts/publish.py: the logical path of each
+// file in course_details/, timetables/ and compiled_degrees/ -> its content-hashed name
+export interface DataIndexFileStructure {
+  files: Record<string, string>;
+}
+
+// A progress counter of a compiled degree: one rule, or one list of a multi-list rule
+export interface CompiledDegreeTarget {
+  rule: string; // ID of the DegreeRule
+  type: DegreeRule['type'];
+  list: string | null; // List name (or combined rule description) for per-list counters
+  unit: 'credits' | 'courses';
+  required: number;
+  all_courses: boolean; // Counts every planned course; such targets have no members
+  exemptions: boolean; // Exemption credits (miluim, general) are added to it
+}
+
+// Contents of compiled_degrees/<degree id>.json, built by scripts/compile_degrees.py from degrees.json
+export interface CompiledDegree {
+  degree: string;
+  name: string;
+  targets: CompiledDegreeTarget[];
+  courses: Record<string, { credits: number; targets: number[] }>; // Course ID -> credits and indexes into targets
+  uncompiled_rules: string[]; // Rules left to evaluateRule (min_grade, classification_courses)
+}
+
+// A session in timetables/<YYYYSS>.json. start and end are minutes since Sunday 00:00;
+// type, building and staff index into the file's string tables; room 0 means none.
+export type TimetableSession = [start: number, end: number, type: number, building: number, room: number, staff: number, event: number];
+
+// An entry of a timetable's index: one session of a course group
+export type TimetableIndexEntry = [start: number, end: number, courseId: string, group: string];
+
+// Contents of timetables/<YYYYSS>.json, built by scripts/timetables.py from each course's schedule
+export interface SemesterTimetable {
+  semester: string; // e.g., "202402"
+  days: string[]; // Day names, indexed by Math.floor(start / 1440)
+  session_fields: string[];
+  types: string[];
+  buildings: string[];
+  staff: string[];
+  courses: Record<string, Record<string, TimetableSession[]>>; // Course ID -> group -> sessions
+  index: TimetableIndexEntry[]; // Every session, sorted by start
+  max_session_minutes: number; // Longest session, bounds the index search in findOverlappingSessions
+}
+
 export type PrerequisiteItem = string; // Course ID
 export interface PrerequisiteGroup {
   type: 'all' | 'one' | 'at_least_X_credits_from_list' | string; 
@@ -0,0 +1,237 @@
+import { CompiledDegree, DegreeRule, DegreeTemplate, RawCourseData } from "../types/data";
+import { EvaluatedRuleStatus } from "./ruleEvaluator";
+
+export interface CompiledTargetProgress {
+    planned: number;
+    done: number;
+}
+
+/**
+ * Adds one course to (or, with sign -1, removes it from) the progress of every
+ * target it counts towards, so a plan edit updates the totals without a rescan.
+ * @param compiled The compiled degree (see fetchCompiledDegree).
+ * @param progress Progress per target, in the order of compiled.targets; updated in place.
+ * @param courseId The course added or removed.
+ * @param credits The course's credits, used for courses outside the compiled course map.
+ * @param isDone Whether the course has a grade or is marked binary.
+ * @param sign 1 to add the course, -1 to remove it.
+ */
+export function applyCourseToTargets(
+    compiled: CompiledDegree,
+    progress: CompiledTargetProgress[],
+    courseId: string,
+    credits: number,
+    isDone: boolean,
+    sign: 1 | -1 = 1
+): void {
+    const course = compiled.courses[courseId];
+    const courseCredits = course ? course.credits : credits;
+    const add = (targetIndex: number) => {
+        const amount = sign * (compiled.targets[targetIndex].unit === "courses" ? 1 : courseCredits);
+        progress[targetIndex].planned += amount;
+        if (isDone) {
+            progress[targetIndex].done += amount;
+        }
+    };
+    compiled.targets.forEach((target, targetIndex) => {
+        if (target.all_courses) {
+            add(targetIndex);
+        }
+    });
+    course?.targets.forEach(add);
+}
+
+/**
+ * Sums the progress of a whole plan towards every target of a compiled degree.
+ * Each course only visits the targets it is a member of, instead of every rule
+ * filtering the plan against its lists as evaluateRule does. Exemption credits
+ * are added to the targets flagged "exemptions", as in evaluateRule.
+ * @param compiled The compiled degree (see fetchCompiledDegree).
+ * @param coursesInPlan The courses currently in the plan.
+ * @param isCourseDone Whether a course has a grade or is marked binary.
+ * @param exemptionCredits Total credits of the checked exemptions.
+ * @returns Progress per target, in the order of compiled.targets.
+ */
+export function sumCompiledTargets(
+    compiled: CompiledDegree,
+    coursesInPlan: RawCourseData[],
+    isCourseDone: (courseId: string) => boolean,
+    exemptionCredits: number = 0
+): CompiledTargetProgress[] {
+    const progress = compiled.targets.map(() => ({ planned: 0, done: 0 }));
+    coursesInPlan.forEach(course => {
+        applyCourseToTargets(compiled, progress, course._id, Number(course.credits) || 0, isCourseDone(course._id));
+    });
+    // Added after the course credits, in the same order as evaluateRule
+    compiled.targets.forEach((target, targetIndex) => {
+        if (target.exemptions) {
+            progress[targetIndex].planned += exemptionCredits;
+            progress[targetIndex].done += exemptionCredits;
+        }
+    });
+    return progress;
+}
+
+const sameIds = (a: string[], b: string[]): boolean => {
+    const aSet = new Set(a);
+    const bSet = new Set(b);
+    return aSet.size === bSet.size && [...aSet].every(id => bSet.has(id));
+};
+
+/**
+ * Whether a compiled plan still describes a template: it was compiled from the
+ * pristine template of the same degree, and the course lists and mandatory courses
+ * have not been edited since. Rules are checked one by one (see isRuleCompiled).
+ * @param compiled The compiled degree, if it was loaded.
+ * @param template The template being displayed, possibly edited by the user.
+ * @param pristineTemplate The template as loaded from degrees.json.
+ */
+export function isCompiledDegreeCurrent(
+    compiled: CompiledDegree | undefined,
+    template: DegreeTemplate,
+    pristineTemplate: DegreeTemplate | undefined
+): compiled is CompiledDegree {
+    if (!compiled || !pristineTemplate || compiled.degree !== template.id || !template["courses-lists"]) {
+        return false;
+    }
+    const pristineMandatoryIds = Object.values(pristineTemplate.semesters || {}).flat();
+    return JSON.stringify(template["courses-lists"]) === JSON.stringify(pristineTemplate["courses-lists"])
+        && sameIds(template.definedMandatoryCourseIds || [], pristineMandatoryIds);
+}
+
+/**
+ * Whether a rule can be evaluated from the compiled plan: it is unchanged from the
+ * pristine template and was compiled (min_grade and classification_courses are not).
+ */
+export function isRuleCompiled(
+    rule: DegreeRule,
+    compiled: CompiledDegree,
+    pristineTemplate: DegreeTemplate
+): boolean {
+    if (compiled.uncompiled_rules.includes(rule.id)) {
+        return false;
+    }
+    const pristineRule = pristineTemplate.rules?.find(r => r.id === rule.id);
+    return !!pristineRule && JSON.stringify(pristineRule) === JSON.stringify(rule);
+}
+
+/**
+ * Builds the same status as evaluateRule from the target progress of a compiled
+ * plan (see sumCompiledTargets). Returns undefined when the rule's targets do not
+ * line up with the rule, e.g. a list that failed to compile; callers then fall
+ * back to evaluateRule.
+ * @param rule A rule for which isRuleCompiled holds.
+ * @param compiled The compiled degree.
+ * @param progress Progress per target, in the order of compiled.targets.
+ * @param degreeCourseLists The template's course lists.
+ */
+export function evaluateCompiledRule(
+    rule: DegreeRule,
+    compiled: CompiledDegree,
+    progress: CompiledTargetProgress[],
+    degreeCourseLists: Record<string, string[] | number[]>
+): EvaluatedRuleStatus | undefined {
+    const targetIndexes: number[] = [];
+    compiled.targets.forEach((target, targetIndex) => {
+        if (target.rule === rule.id) {
+            targetIndexes.push(targetIndex);
+        }
+    });
+
+    switch (rule.type) {
+        case 'total_credits':
+        case 'minCredits':
+        case 'credits_from_list':
+        case 'minCreditsFromMandatory':
+        case 'minCreditsFromAnySelectiveList':
+        case 'minCreditsFromIdPattern':
+        case 'minCoursesFromList': {
+            if (targetIndexes.length !== 1) {
+                return undefined;
+            }
+            const { required } = compiled.targets[targetIndexes[0]];
+            const { planned, done } = progress[targetIndexes[0]];
+            let currentProgressString: string;
+            let currentValuePlanned: number;
+            if (rule.type === 'minCoursesFromList') {
+                currentValuePlanned = planned;
+                currentProgressString = `${done}/${required} קורסים מ${rule.listName} (מתוכנן: ${planned})`;
+            } else {
+                let descriptionSuffix = '';
+                if (rule.type === 'credits_from_list') descriptionSuffix = ` מ${rule.course_list_name}`;
+                if (rule.type === 'minCreditsFromAnySelectiveList' || rule.type === 'minCreditsFromIdPattern') descriptionSuffix = ' ';
+                currentValuePlanned = Math.max(planned, done);
+                currentProgressString = `${done}/${required}${descriptionSuffix} נק"ז (מתוכנן: ${currentValuePlanned})`;
+            }
+            return {
+                currentProgressString,
+                isSatisfied: done >= required,
+                currentValuePlanned,
+                currentValueDone: done,
+                requiredValue: required,
+                listProgressDetails: null,
+            };
+        }
+
+        case 'minCoursesFromMultipleLists':
+        case 'minCreditsFromSelectedLists': {
+            const isMultipleLists = rule.type === 'minCoursesFromMultipleLists';
+            const subRuleCount = isMultipleLists ? rule.lists?.length : rule.combinedRules?.length;
+            if (!subRuleCount || targetIndexes.length !== subRuleCount) {
+                return undefined;
+            }
+            const details: NonNullable<EvaluatedRuleStatus['listProgressDetails']> = [];
+            let aggregateDone = 0;
+            let aggregatePlanned = 0;
+            let aggregateRequired = 0;
+            let isSatisfied = true;
+            for (let i = 0; i < subRuleCount; i++) {
+                const target = compiled.targets[targetIndexes[i]];
+                const { planned, done } = progress[targetIndexes[i]];
+                const listName = isMultipleLists ? rule.lists![i].listName : rule.combinedRules![i].description;
+                if (typeof target.required !== 'number' || target.list !== listName) {
+                    return undefined;
+                }
+                if (isMultipleLists && !Array.isArray(degreeCourseLists[listName])) {
+                    // evaluateRule reports a list missing from the template without progress
+                    details.push({ listName: listName || 'לא ידוע', currentValuePlanned: 0, currentValueDone: 0, requiredValue: target.required, isSatisfied: false });
+                    aggregateRequired += target.required;
+                    isSatisfied = false;
+                    continue;
+                }
+                const subRuleSatisfied = done >= target.required;
+                details.push({
+                    listName,
+                    currentValuePlanned: planned,
+                    currentValueDone: done,
+                    requiredValue: target.required,
+                    isSatisfied: subRuleSatisfied,
+                    unit: target.unit === 'courses' ? 'קורסים' : 'נק"ז',
+                });
+                aggregateDone += done;
+                aggregatePlanned += planned;
+                aggregateRequired += target.required;
+                isSatisfied = isSatisfied && subRuleSatisfied;
+            }
+            // The aggregate unit is worded from the rule, as evaluateRule does
+            const hasOnlyCredits = isMultipleLists
+                ? rule.lists!.every(list => list.minCredits !== undefined)
+                : rule.combinedRules!.every(cr => cr.requirementType === 'credits');
+            const hasMixedUnits = isMultipleLists
+                ? rule.lists!.some(list => list.minCredits !== undefined) && rule.lists!.some(list => list.min !== undefined)
+                : rule.combinedRules!.some(cr => cr.requirementType === 'courses') && rule.combinedRules!.some(cr => cr.requirementType === 'credits');
+            const aggregateUnit = hasOnlyCredits ? 'נק"ז' : hasMixedUnits ? 'יחידות' : 'קורסים';
+            return {
+                currentProgressString: `${aggregateDone}/${aggregateRequired} ${aggregateUnit} (מתוכנן: ${aggregatePlanned})`,
+                isSatisfied,
+                currentValuePlanned: aggregatePlanned,
+                currentValueDone: aggregateDone,
+                requiredValue: aggregateRequired,
+                listProgressDetails: details,
+            };
+        }
+
+        default:
+            return undefined;
+    }
+}
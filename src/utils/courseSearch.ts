@@ -0,0 +1,94 @@
+import { CourseSearchIndex } from "../types/data";
+import { normalizeSearchText } from "./hebrewUtils";
+
+const DIGITS_RE = /^\d+$/;
+
+/**
+ * Returns the position of the first ID in the sorted ids that is not before prefix.
+ */
+function firstIdNotBefore(ids: string[], prefix: string): number {
+    let low = 0;
+    let high = ids.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (ids[mid] < prefix) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+    return low;
+}
+
+/**
+ * Intersects two sorted ordinal lists.
+ */
+function intersectSorted(a: ArrayLike<number>, b: ArrayLike<number>): number[] {
+    const result: number[] = [];
+    let i = 0;
+    let j = 0;
+    while (i < a.length && j < b.length) {
+        if (a[i] < b[j]) {
+            i++;
+        } else if (a[i] > b[j]) {
+            j++;
+        } else {
+            result.push(a[i]);
+            i++;
+            j++;
+        }
+    }
+    return result;
+}
+
+/**
+ * Finds the courses matching a search query using the prebuilt search index.
+ * A query that is a single number matches course numbers starting with it.
+ * Otherwise every word of the query must appear in the course's name or lecturer
+ * (or, for numbers, start its course number). Candidates come from intersecting
+ * the n-gram posting lists of the words, so only they are checked.
+ * @param index The search index (see fetchCourseSearchIndex).
+ * @param query The text typed by the user.
+ * @returns The matching course IDs, or null if the query has nothing to search for.
+ */
+export function searchCourseIds(index: CourseSearchIndex, query: string): Set<string> | null {
+    const words = normalizeSearchText(query).split(" ").filter(Boolean);
+    if (words.length === 0) {
+        return null;
+    }
+    const { ids, texts } = index;
+    const matches = new Set<string>();
+
+    if (words.length === 1 && DIGITS_RE.test(words[0])) {
+        for (let i = firstIdNotBefore(ids, words[0]); i < ids.length && ids[i].startsWith(words[0]); i++) {
+            matches.add(ids[i]);
+        }
+        return matches;
+    }
+
+    // Shortest posting lists first keeps the intermediate intersections small
+    const postingLists: ArrayLike<number>[] = [];
+    for (const word of words.filter(word => !DIGITS_RE.test(word))) {
+        for (let start = 0; start + index.ngramSize <= word.length; start++) {
+            const postings = index.postings.get(word.slice(start, start + index.ngramSize));
+            if (!postings) {
+                return matches;
+            }
+            postingLists.push(postings);
+        }
+    }
+    postingLists.sort((a, b) => a.length - b.length);
+    const candidates = postingLists.reduce<ArrayLike<number> | undefined>(
+        (result, postings) => (result ? intersectSorted(result, postings) : postings),
+        undefined
+    );
+
+    const candidateCount = candidates ? candidates.length : ids.length;
+    for (let i = 0; i < candidateCount; i++) {
+        const ordinal = candidates ? candidates[i] : i;
+        if (words.every(word => texts[ordinal].includes(word) || (DIGITS_RE.test(word) && ids[ordinal].startsWith(word)))) {
+            matches.add(ids[ordinal]);
+        }
+    }
+    return matches;
+}
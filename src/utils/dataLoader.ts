@@ -1,11 +1,73 @@
-import { DegreesFileStructure, RawCourseData, DegreeTemplate } from '../types/data';
+import { DegreesFileStructure, RawCourseData, DegreeTemplate, CourseDetails, CourseIndexes, CourseIndexesFileStructure, CourseUnlocksFileStructure, SemesterTimetable, CourseSearchIndex, SearchIndexFileStructure, CompiledDegree, DataIndexFileStructure } from '../types/data';
 
 // const DATA_BASE_PATH = '/data'; // REMOVED
 
+// Must match COURSE_DETAIL_SHARD_PREFIX_LENGTH in scripts/update_semesters.py
+const COURSE_DETAIL_SHARD_PREFIX_LENGTH = 3;
+
+// Detail shards already requested, keyed by course-id prefix, so each shard is downloaded once
+const courseDetailShards = new Map<string, Promise<Record<string, CourseDetails>>>();
+
+// The search index is shared by every course picker, so it is downloaded and decoded once
+let courseSearchIndex: Promise<CourseSearchIndex | undefined> | undefined;
+
+// The reverse prerequisite map is only needed by the course detail view, so it is downloaded on first use
+let courseUnlocks: Promise<CourseUnlocksFileStructure | undefined> | undefined;
+
+// Generated files the app loads are published under content-hashed names listed in
+// data_index.json (see scripts/publish.py). Loaded once, and again when a listed file is gone.
+let dataIndex: Promise<Record<string, string> | undefined> | undefined;
+
+const getDataPath = (relativePath: string): string =>
+  `${import.meta.env.BASE_URL.replace(/\/$/, '')}/data/${relativePath}`.replace(/\/\//g, '/');
+
+// Resolves the logical path of a generated file (e.g. "timetables/202401.json") to the
+// URL of its published, content-hashed copy. Throws if the file is not in the index.
+const getGeneratedDataPath = async (relativePath: string): Promise<string> => {
+  if (!dataIndex) {
+    // The only file whose name is reused across publishes, so the browser cache is revalidated
+    dataIndex = fetch(getDataPath('data_index.json'), { cache: 'no-cache' }).then(response => {
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json() as Promise<DataIndexFileStructure>;
+    }).then(index => index.files).catch(error => {
+      dataIndex = undefined; // Allow a retry on the next request
+      console.error("Failed to fetch data index:", error);
+      return undefined;
+    });
+  }
+  const hashedPath = (await dataIndex)?.[relativePath];
+  if (!hashedPath) {
+    throw new Error(`${relativePath} is not listed in data_index.json`);
+  }
+  return getDataPath(hashedPath.split('/').map(encodeURIComponent).join('/'));
+};
+
+// Fetches a generated file through data_index.json. A publish keeps the files of the
+// previous index for one more cycle only, so a tab open across several publishes can
+// hold an index whose files are gone; on a failure the index is reloaded and the
+// request retried once. The response is returned as is for the caller to check.
+const fetchGeneratedData = async (relativePath: string, isRetry = false): Promise<Response> => {
+  try {
+    const response = await fetch(await getGeneratedDataPath(relativePath));
+    if (response.ok || isRetry) {
+      return response;
+    }
+  } catch (error) {
+    if (isRetry) {
+      throw error;
+    }
+  }
+  dataIndex = undefined;
+  return fetchGeneratedData(relativePath, true);
+};
+
+// Loads the slim course index (name, credits, prereqTree, semesters, no_credit_courses).
+// Syllabus, notes, exams etc. are loaded on demand with fetchCourseDetails.
 export async function fetchAllCourses(): Promise<RawCourseData[]> {
   try {
-    const mergedCoursesPath = `${import.meta.env.BASE_URL.replace(/\/$/, '')}/data/merged_courses.json`.replace(/\/\//g, '/');
-    const response = await fetch(mergedCoursesPath);
+    const response = await fetchGeneratedData('courses_index.json');
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
@@ -35,9 +97,130 @@ export async function fetchAllCourses(): Promise<RawCourseData[]> {
   }
 }
 
+// Loads the equivalence sets built by the data pipeline.
+// Returns undefined on failure; callers then fall back to scanning the course list.
+export async function fetchCourseIndexes(): Promise<CourseIndexes | undefined> {
+  try {
+    const response = await fetchGeneratedData('course_indexes.json');
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json() as CourseIndexesFileStructure;
+    return {
+      equivalents: new Map(Object.entries(data.equivalents).map(([id, ids]) => [id, new Set(ids)])),
+    };
+  } catch (error) {
+    console.error("Failed to fetch course indexes:", error);
+    return undefined;
+  }
+}
+
+// Loads the course search index (see searchCourseIds in courseSearch.ts), decoding its posting lists.
+// Resolves to undefined on failure; callers then fall back to scanning the course list.
+export function fetchCourseSearchIndex(): Promise<CourseSearchIndex | undefined> {
+  if (!courseSearchIndex) {
+    courseSearchIndex = (async () => {
+      try {
+        const response = await fetchGeneratedData('search_index.json');
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json() as SearchIndexFileStructure;
+        const postings = new Map<string, Int32Array>();
+        Object.entries(data.postings).forEach(([ngram, deltas]) => {
+          const ordinals = new Int32Array(deltas.length);
+          let ordinal = 0;
+          deltas.forEach((delta, i) => {
+            ordinal += delta;
+            ordinals[i] = ordinal;
+          });
+          postings.set(ngram, ordinals);
+        });
+        return { ngramSize: data.ngram_size, ids: data.ids, texts: data.texts, postings };
+      } catch (error) {
+        courseSearchIndex = undefined; // Allow a retry on the next request
+        console.error("Failed to fetch course search index:", error);
+        return undefined;
+      }
+    })();
+  }
+  return courseSearchIndex;
+}
+
+// Returns the courses whose prerequisites mention courseId, from course_unlocks.json.
+// Resolves to an empty list on failure.
+export async function fetchCourseUnlocks(courseId: string): Promise<string[]> {
+  if (!courseUnlocks) {
+    courseUnlocks = fetchGeneratedData('course_unlocks.json').then(response => {
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json() as Promise<CourseUnlocksFileStructure>;
+    }).catch(error => {
+      courseUnlocks = undefined; // Allow a retry on the next request
+      console.error("Failed to fetch course unlocks:", error);
+      return undefined;
+    });
+  }
+  const unlocks = await courseUnlocks;
+  return unlocks?.[courseId] ?? [];
+}
+
+// Loads the detail fields of a single course from its shard in data/course_details/.
+export async function fetchCourseDetails(courseId: string): Promise<CourseDetails | undefined> {
+  const prefix = courseId.slice(0, COURSE_DETAIL_SHARD_PREFIX_LENGTH);
+  let shard = courseDetailShards.get(prefix);
+  if (!shard) {
+    shard = fetchGeneratedData(`course_details/${prefix}.json`).then(response => {
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json() as Promise<Record<string, CourseDetails>>;
+    });
+    courseDetailShards.set(prefix, shard);
+  }
+
+  try {
+    return (await shard)[courseId];
+  } catch (error) {
+    courseDetailShards.delete(prefix); // Allow a retry on the next request
+    console.error(`Failed to fetch course details for ${courseId}:`, error);
+    return undefined;
+  }
+}
+
+// Loads the timetable of a semester ("YYYYSS", as in last_semesters.json) from data/timetables/.
+export async function fetchSemesterTimetable(semesterKey: string): Promise<SemesterTimetable | undefined> {
+  try {
+    const response = await fetchGeneratedData(`timetables/${semesterKey}.json`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json() as SemesterTimetable;
+  } catch (error) {
+    console.error(`Failed to fetch timetable for semester ${semesterKey}:`, error);
+    return undefined;
+  }
+}
+
+// Loads the compiled rules of a degree template (see sumCompiledTargets in compiledDegree.ts).
+// Returns undefined on failure or for degrees without a compiled plan; callers then use evaluateRule.
+export async function fetchCompiledDegree(degreeId: string): Promise<CompiledDegree | undefined> {
+  try {
+    const response = await fetchGeneratedData(`compiled_degrees/${degreeId}.json`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json() as CompiledDegree;
+  } catch (error) {
+    console.error(`Failed to fetch compiled degree ${degreeId}:`, error);
+    return undefined;
+  }
+}
+
 export async function fetchDegreeTemplates(): Promise<DegreesFileStructure> {
   try {
-    const degreesPath = `${import.meta.env.BASE_URL.replace(/\/$/, '')}/data/degrees.json`.replace(/\/\//g, '/');
+    const degreesPath = getDataPath('degrees.json');
     const response = await fetch(degreesPath);
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
@@ -7,4 +7,22 @@ export const numberToHebrewLetter = (num: number): string => {
   ];
   if (num > letters.length) return num.toString() + '׳'; // Fallback for numbers > 22, also add Geresh
   return letters[num - 1] + '׳'; // Add Geresh
-}; 
\ No newline at end of file
+}; 
+
+// Must match normalize_search_text in scripts/search_index.py, which builds search_index.json
+const SEARCH_DROPPED_CHARS_RE = /[\u0591-\u05C7\u05F3\u05F4'"`]/g;
+const SEARCH_SEPARATOR_RE = /[^0-9a-z\u05D0-\u05EA]+/g;
+const HEBREW_FINAL_LETTERS: Record<string, string> = { 'ך': 'כ', 'ם': 'מ', 'ן': 'נ', 'ף': 'פ', 'ץ': 'צ' };
+
+/**
+ * Normalizes text for course search: drops niqqud, quotes and geresh/gershayim,
+ * folds final letters to their regular form and lowercases Latin letters.
+ * Any other character separates words, e.g. 'פרופ"ח ז׳ורז' -> 'פרופח זורז'.
+ */
+export const normalizeSearchText = (text: string): string =>
+  text
+    .toLowerCase()
+    .replace(SEARCH_DROPPED_CHARS_RE, '')
+    .replace(/[ךםןףץ]/g, letter => HEBREW_FINAL_LETTERS[letter])
+    .replace(SEARCH_SEPARATOR_RE, ' ')
+    .trim();
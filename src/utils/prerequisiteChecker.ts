@@ -1,4 +1,4 @@
-import { PrerequisiteItem, PrerequisiteGroup, RawCourseData } from '../types/data';
+import { PrerequisiteItem, PrerequisiteGroup, RawCourseData, CourseIndexes } from '../types/data';
 
 // Helper to get the semester index (0-based) a course is in, or -1 if not found
 // IMPORTANT: This relies on the ORDER of semesters in Object.entries, which might not be guaranteed.
@@ -12,15 +12,18 @@ import { PrerequisiteItem, PrerequisiteGroup, RawCourseData } from '../types/dat
 //   return Object.keys(semesters).findIndex(key => key === entry[0]);
 // };
 
-// Helper to get equivalent courses (including no_credit_courses)
-export const getEquivalentCourses = (courseId: string, allCoursesData: RawCourseData[]): Set<string> => {
+// Helper to get equivalent courses (including no_credit_courses).
+// Uses the precomputed course_indexes.json sets when available; the returned set must not be modified.
+export const getEquivalentCourses = (courseId: string, allCoursesData: RawCourseData[], courseIndexes?: CourseIndexes): Set<string> => {
+  if (courseIndexes) {
+    return courseIndexes.equivalents.get(courseId) ?? new Set<string>([courseId]);
+  }
+
   const equivalents = new Set<string>([courseId]);
   const course = allCoursesData.find(c => c._id === courseId);
   
   if (course?.no_credit_courses) {
-    // Split by comma or one or more whitespace characters, then trim any remaining whitespace from individual IDs
-    const equivalentIds = course.no_credit_courses.split(/[,\s]+/).map(id => id.trim()).filter(id => id); // filter empty strings
-    equivalentIds.forEach(id => equivalents.add(id));
+    course.no_credit_courses.forEach(id => equivalents.add(id));
   }
   
   return equivalents;
@@ -71,7 +74,8 @@ export function checkPrerequisites(
   currentSemesterNumber: number,
   templateSemesters: Record<string, string[]>,
   allCoursesData: RawCourseData[],
-  classificationChecked: Record<string, boolean>
+  classificationChecked: Record<string, boolean>,
+  courseIndexes?: CourseIndexes
 ): PrereqStatus { // Changed return type
   if (!targetCourseData?.prereqTree) {
     if (import.meta.env.DEV) {
@@ -108,7 +112,7 @@ export function checkPrerequisites(
         }
 
         for (const placedCourseId of coursesInThisSemester) {
-          const equivalentsOfPlacedCourse = getEquivalentCourses(placedCourseId, allCoursesData);
+          const equivalentsOfPlacedCourse = getEquivalentCourses(placedCourseId, allCoursesData, courseIndexes);
           const isMatch = equivalentsOfPlacedCourse.has(prereq as string); 
 
           if (isMatch) {
@@ -1,5 +1,8 @@
 import { DegreeRule, RawCourseData } from '../types/data';
 
+// Classification entries whose credits count as exemptions
+const EXEMPTION_IDS = ['miluim_exemption', 'general_exemption'];
+
 export interface EvaluatedRuleStatus {
   currentProgressString: string;
   isSatisfied: boolean; // Overall satisfaction based on "done" courses
@@ -20,6 +23,39 @@ export interface EvaluatedRuleStatus {
   // We can add more detailed progress info if needed, e.g., current_credits, required_credits
 }
 
+/**
+ * Whether a course counts as done: it has a non-empty grade or is marked as binary.
+ */
+export function isCourseDone(
+  courseId: string,
+  grades: Record<string, string>,
+  binaryStates: Record<string, boolean>
+): boolean {
+  const gradeStr = grades[courseId];
+  const isBinary = binaryStates[courseId] === true; // Check if binary flag is explicitly true
+  const hasGrade = !!gradeStr && gradeStr.trim() !== '';
+  return hasGrade || isBinary; // Course is done if it has a grade OR is marked as binary
+}
+
+/**
+ * Total credits of the checked exemptions (miluim, general), which count towards
+ * total_credits and minCreditsFromAnySelectiveList.
+ */
+export function getExemptionCredits(
+  classificationChecked?: Record<string, boolean>,
+  classificationCredits?: Record<string, number>
+): number {
+  let exemptionCredits = 0;
+  if (classificationChecked && classificationCredits) {
+    for (const exemptionId of EXEMPTION_IDS) {
+      if (classificationChecked[exemptionId] && typeof classificationCredits[exemptionId] === 'number') {
+        exemptionCredits += classificationCredits[exemptionId];
+      }
+    }
+  }
+  return exemptionCredits;
+}
+
 /**
  * Evaluates a single degree rule based on the current set of courses and their grades.
  */
@@ -44,12 +80,7 @@ export function evaluateRule(
   let listProgressDetails: EvaluatedRuleStatus['listProgressDetails'] = null;
 
   // Helper to check if a course is considered "done" (has a non-empty grade OR is marked as binary)
-  const isCourseDone = (courseId: string): boolean => {
-    const gradeStr = grades[courseId];
-    const isBinary = binaryStates[courseId] === true; // Check if binary flag is explicitly true
-    const hasGrade = !!gradeStr && gradeStr.trim() !== '';
-    return hasGrade || isBinary; // Course is done if it has a grade OR is marked as binary
-  };
+  const isDone = (courseId: string): boolean => isCourseDone(courseId, grades, binaryStates);
 
   // Helper to parse grade string to number, handling non-numeric/empty as 0 or NaN for checks
   const getNumericGrade = (courseId: string): number => {
@@ -151,7 +182,7 @@ export function evaluateRule(
       // Calculate Planned and Done credits from the relevant subset
       currentValuePlanned = coursesToConsider.reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
       currentValueDone = coursesToConsider
-        .filter(course => isCourseDone(course._id))
+        .filter(course => isDone(course._id))
         .reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
 
       if (import.meta.env.DEV && (rule.type === 'minCreditsFromMandatory' || rule.type === 'total_credits')) { // Also log for total_credits for comparison
@@ -163,17 +194,10 @@ export function evaluateRule(
       }
 
       // Apply credit exemptions if applicable for total_credits or minCreditsFromAnySelectiveList
-      if (
-        (rule.type === 'total_credits' || rule.type === 'minCreditsFromAnySelectiveList') &&
-        classificationChecked && classificationCredits
-      ) {
-        for (const exemptionId of ['miluim_exemption', 'general_exemption']) {
-          if (classificationChecked[exemptionId] && typeof classificationCredits[exemptionId] === 'number') {
-            const exemptionVal = classificationCredits[exemptionId];
-            if (currentValueDone !== null) currentValueDone += exemptionVal;
-            if (currentValuePlanned !== null) currentValuePlanned += exemptionVal;
-          }
-        }
+      if (rule.type === 'total_credits' || rule.type === 'minCreditsFromAnySelectiveList') {
+        const exemptionCredits = getExemptionCredits(classificationChecked, classificationCredits);
+        currentValueDone += exemptionCredits;
+        currentValuePlanned += exemptionCredits;
       }
       
       // Finalize calculations for satisfaction and progress string
@@ -205,7 +229,7 @@ export function evaluateRule(
         
         requiredValue = rule.min;
         currentValuePlanned = coursesFromListInPlan.length;
-        currentValueDone = coursesFromListInPlan.filter(cp => isCourseDone(cp._id)).length;
+        currentValueDone = coursesFromListInPlan.filter(cp => isDone(cp._id)).length;
         isSatisfied = currentValueDone >= requiredValue;
         currentProgressString = `${currentValueDone}/${requiredValue} ${unit} מ${rule.listName} (מתוכנן: ${currentValuePlanned})`;
       } else {
@@ -260,7 +284,7 @@ export function evaluateRule(
               // Handle credit-based requirement
               const plannedCredits = coursesFromListInPlan.reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
               const doneCredits = coursesFromListInPlan
-                .filter(cp => isCourseDone(cp._id))
+                .filter(cp => isDone(cp._id))
                 .reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
               
               listCurrentPlanned = plannedCredits;
@@ -278,7 +302,7 @@ export function evaluateRule(
                 console.debug(`[evaluateRule DEBUG]       Course details:`, coursesFromListInPlan.map(c => ({
                   id: c._id,
                   credits: c.credits,
-                  isDone: isCourseDone(c._id),
+                  isDone: isDone(c._id),
                   grade: grades[c._id] || 'no grade',
                   isBinary: binaryStates[c._id] || false
                 })));
@@ -291,7 +315,7 @@ export function evaluateRule(
             } else if (min !== undefined) {
               // Handle course-based requirement
               listCurrentPlanned = coursesFromListInPlan.length;
-              listCurrentDone = coursesFromListInPlan.filter(cp => isCourseDone(cp._id)).length;
+              listCurrentDone = coursesFromListInPlan.filter(cp => isDone(cp._id)).length;
               listSatisfied = listCurrentDone >= min;
                              listProgressText = `${listName}: ${listCurrentDone}/${min} קורסים (מתוכנן: ${listCurrentPlanned})`;
                detailsArray.push({ listName, currentValuePlanned: listCurrentPlanned, currentValueDone: listCurrentDone, requiredValue: min, isSatisfied: listSatisfied, unit: 'קורסים' });
@@ -387,12 +411,12 @@ export function evaluateRule(
               
               if (requirementType === 'courses') {
                 subRulePlanned += coursesFromListInPlan.length;
-                subRuleDone += coursesFromListInPlan.filter(cp => isCourseDone(cp._id)).length;
+                subRuleDone += coursesFromListInPlan.filter(cp => isDone(cp._id)).length;
               } else {
                 // Default to credits
                 subRulePlanned += coursesFromListInPlan.reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
                 subRuleDone += coursesFromListInPlan
-                  .filter(cp => isCourseDone(cp._id))
+                  .filter(cp => isDone(cp._id))
                   .reduce((sum, course) => sum + (Number(course.credits) || 0), 0);
               }
             }
@@ -469,7 +493,7 @@ export function evaluateRule(
         let coursesPassedMinGrade = 0;
         rule.courses_for_min_grade.forEach(courseIdToCheck => {
           // Only check if the course is actually DONE
-          if (isCourseDone(courseIdToCheck)) { 
+          if (isDone(courseIdToCheck)) { 
             coursesChecked++;
             if (getNumericGrade(courseIdToCheck) >= (rule.min_grade_value || 0)) {
               coursesPassedMinGrade++;
@@ -0,0 +1,72 @@
+import { SemesterTimetable, TimetableIndexEntry } from "../types/data";
+
+/**
+ * Returns the position of the first index entry starting at or after minute.
+ */
+function firstEntryStartingFrom(index: TimetableIndexEntry[], minute: number): number {
+    let low = 0;
+    let high = index.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (index[mid][0] < minute) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+    return low;
+}
+
+/**
+ * Finds all sessions of a semester that overlap a time range.
+ * Only entries starting within max_session_minutes before the range can reach into it,
+ * so this is a binary search plus a short scan rather than a pass over every course.
+ * @param timetable The semester timetable (see fetchSemesterTimetable).
+ * @param start Range start, in minutes since Sunday 00:00.
+ * @param end Range end (exclusive), in minutes since Sunday 00:00.
+ * @returns The overlapping index entries, ordered by start.
+ */
+export function findOverlappingSessions(
+    timetable: SemesterTimetable,
+    start: number,
+    end: number
+): TimetableIndexEntry[] {
+    const { index } = timetable;
+    const overlapping: TimetableIndexEntry[] = [];
+    for (let i = firstEntryStartingFrom(index, start - timetable.max_session_minutes); i < index.length && index[i][0] < end; i++) {
+        if (index[i][1] > start) {
+            overlapping.push(index[i]);
+        }
+    }
+    return overlapping;
+}
+
+/**
+ * Finds the groups of other courses that clash with a course group.
+ * @param timetable The semester timetable (see fetchSemesterTimetable).
+ * @param courseId The course whose group is checked.
+ * @param group The group number of that course, e.g. "11".
+ * @param candidateCourseIds Optional set limiting the result to these courses (e.g. the planned ones).
+ * @returns Map of clashing course ID to the set of its clashing groups.
+ */
+export function findGroupClashes(
+    timetable: SemesterTimetable,
+    courseId: string,
+    group: string,
+    candidateCourseIds?: Set<string>
+): Map<string, Set<string>> {
+    const clashes = new Map<string, Set<string>>();
+    const sessions = timetable.courses[courseId]?.[group] ?? [];
+    sessions.forEach(([start, end]) => {
+        findOverlappingSessions(timetable, start, end).forEach(([, , otherCourseId, otherGroup]) => {
+            if (otherCourseId === courseId || (candidateCourseIds && !candidateCourseIds.has(otherCourseId))) {
+                return;
+            }
+            if (!clashes.has(otherCourseId)) {
+                clashes.set(otherCourseId, new Set());
+            }
+            clashes.get(otherCourseId)!.add(otherGroup);
+        });
+    });
+    return clashes;
+}